@@ -0,0 +1,221 @@
+# acquisition.py
+# Concurrent, timeout-bounded sensor reads for the logging/detection loops.
+#
+# Each sensor gets a SensorReader on its own daemon thread. A tick asks
+# every reader for a fresh value at once and waits for each one only up to
+# that sensor's timeout; whatever doesn't arrive in time is served from the
+# last good value, with its age and fresh=False, as is a value re-served
+# because it is younger than the sensor's min period. A failed DHT11 read is
+# retried on the reader's thread, so it never holds up the tick. Every value
+# carries the time it was actually acquired, not the time the tick started,
+# so a loop that needs this tick's measurement checks `fresh`.
+#
+#   MOCK_GPIO=1 python acquisition.py   (tick latency with a slow, flaky DHT)
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# value is None until the first good read; age is seconds since acquisition
+Reading = namedtuple("Reading", "value acquired_at age fresh")
+
+
+class SensorReader:
+    """Reads one sensor on a daemon thread, on request.
+
+    read: callable returning the value; exceptions count as failed reads
+    min_period: reuse a value younger than this instead of reading again
+        (the DHT11 can't be read more than about once every 2 s)
+    retry_delay: wait between attempts after a failed read
+    """
+
+    def __init__(self, name, read, min_period=0.0, retry_delay=1.0,
+                 clock=time.monotonic, metrics=None):
+        self.name = name
+        self.read = read
+        self.min_period = min_period
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.metrics = metrics
+        self.cond = threading.Condition()
+        self.wanted = 0      # requests made
+        self.served = 0      # requests answered (a new read, or one within min_period)
+        self.read_for = 0    # requests answered by a new read
+        self.value = None
+        self.acquired_at = None
+        self.acquired_mono = None
+        self.last_error = None
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name=f"sensor-{name}", daemon=True)
+        self.thread.start()
+
+    def request(self):
+        """Ask for a fresh value; returns a ticket for result()."""
+        with self.cond:
+            self.wanted += 1
+            self.cond.notify_all()
+            return self.wanted
+
+    def result(self, ticket, timeout):
+        """Wait up to `timeout` seconds for the value asked for with `ticket`,
+        then return the latest good Reading (possibly an older one)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.served >= ticket or self.stopping, timeout)
+            return self._reading(self.read_for >= ticket)
+
+    def _reading(self, fresh):
+        if self.acquired_mono is None:
+            return Reading(None, None, None, False)
+        return Reading(self.value, self.acquired_at, max(0.0, self.clock() - self.acquired_mono), fresh)
+
+    def close(self, timeout=1.0):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.wanted > self.served or self.stopping)
+                if self.stopping:
+                    return
+                ticket = self.wanted
+                recent = (self.acquired_mono is not None
+                          and self.clock() - self.acquired_mono < self.min_period)
+                if recent:
+                    self.served = ticket
+                    self.cond.notify_all()
+                    continue
+            try:
+                start = time.perf_counter()
+                value = self.read()
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                self.last_error = e
+                if self.metrics is not None:
+                    self.metrics.inc("sensor_errors")
+                    self.metrics.inc(f"{self.name}_errors")
+                # Still wanted: retry after the delay (the tick has long moved on)
+                with self.cond:
+                    self.cond.wait_for(lambda: self.stopping, self.retry_delay)
+                continue
+            with self.cond:
+                self.value = value
+                self.acquired_at = datetime.now()
+                self.acquired_mono = self.clock()
+                self.served = self.read_for = ticket
+                self.cond.notify_all()
+            if self.metrics is not None:
+                self.metrics.observe(f"{self.name}_read", elapsed)
+
+
+class Acquisition:
+    """All of a loop's sensors, read together once per tick."""
+
+    def __init__(self, readers, timeouts, max_age=None, metrics=None):
+        """readers: {name: SensorReader}; timeouts: {name: seconds};
+        max_age: {name: seconds} after which a cached value counts as missing."""
+        self.readers = readers
+        self.timeouts = timeouts
+        self.max_age = max_age or {}
+        self.metrics = metrics
+
+    def read(self):
+        """{name: Reading} for every sensor; never waits longer than the
+        largest per-sensor timeout."""
+        tickets = {name: reader.request() for name, reader in self.readers.items()}
+        start = time.perf_counter()
+        readings = {}
+        for name, reader in self.readers.items():
+            left = self.timeouts.get(name, 0.0) - (time.perf_counter() - start)
+            reading = reader.result(tickets[name], max(0.0, left))
+            limit = self.max_age.get(name)
+            if reading.value is not None and limit is not None and reading.age > limit:
+                reading = Reading(None, reading.acquired_at, reading.age, False)
+            readings[name] = reading
+            if self.metrics is not None:
+                if not reading.fresh:
+                    self.metrics.inc(f"{name}_stale")
+                if reading.age is not None:
+                    self.metrics.set(f"{name}_age_seconds", round(reading.age, 3))
+        return readings
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+
+
+def _read_dht(dht):
+    temp, hum = dht.temperature, dht.humidity
+    if temp is None or hum is None:
+        raise ValueError("Invalid DHT reading")
+    return temp, hum
+
+
+def acquisition_from_config(config, gpio, dht, metrics=None):
+    """Acquisition for the PIR and DHT11 per the ACQUISITION section of config.json."""
+    settings = config.get("ACQUISITION", {})
+    pir_pin = config["GPIO"]["PIR_PIN"]
+    readers = {
+        "pir": SensorReader("pir", lambda: gpio.input(pir_pin), metrics=metrics),
+        "dht": SensorReader("dht", lambda: _read_dht(dht),
+                            settings.get("dht_min_period_sec", 2.0),
+                            settings.get("dht_retry_sec", 2.0), metrics=metrics),
+    }
+    timeouts = {
+        "pir": settings.get("pir_timeout_sec", 0.05),
+        "dht": settings.get("dht_timeout_sec", 0.5),
+    }
+    max_age = {"dht": settings.get("dht_max_age_sec", 30)}
+    return Acquisition(readers, timeouts, max_age, metrics)
+
+
+# Tick latency with a DHT that is slow and fails often
+if __name__ == "__main__":
+    import json
+
+    from sim_sensors import SimulatedDHT, load_gpio
+
+    class SlowDHT(SimulatedDHT):
+        def _measure(self):
+            time.sleep(0.3)   # a DHT11 read takes ~0.25 s, retries included
+            super()._measure()
+
+    with open("config.json") as f:
+        CONFIG = json.load(f)
+    GPIO = load_gpio()
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(CONFIG["GPIO"]["PIR_PIN"], GPIO.IN)
+    dht = SlowDHT(CONFIG["GPIO"]["DHT_PIN"], error_rate=0.3, seed=1)
+
+    serial = []
+    for _ in range(10):
+        start = time.perf_counter()
+        GPIO.input(CONFIG["GPIO"]["PIR_PIN"])
+        while True:
+            try:
+                _read_dht(dht)
+                break
+            except RuntimeError:
+                time.sleep(0.1)
+        serial.append(time.perf_counter() - start)
+        time.sleep(0.5)
+
+    acquisition = acquisition_from_config(CONFIG, GPIO, dht)
+    ticks, stale_ages = [], []
+    for _ in range(20):
+        start = time.perf_counter()
+        readings = acquisition.read()
+        ticks.append(time.perf_counter() - start)
+        if not readings["dht"].fresh:
+            stale_ages.append(readings["dht"].age or 0.0)  # as old as it was when served
+        time.sleep(0.5)
+    acquisition.close()
+
+    print(f"🐢 Serial reads:     median tick {1000 * sorted(serial)[len(serial) // 2]:7.1f} ms, "
+          f"worst {1000 * max(serial):7.1f} ms")
+    print(f"⚡ Concurrent reads: median tick {1000 * sorted(ticks)[len(ticks) // 2]:7.1f} ms, "
+          f"worst {1000 * max(ticks):7.1f} ms "
+          f"({len(stale_ages)}/{len(ticks)} ticks used a cached DHT value"
+          + (f", up to {max(stale_ages):.1f}s old)" if stale_ages else ")"))
@@ -0,0 +1,254 @@
+# alerts.py
+# Buzzer / LED / Telegram alerting for realtime_detector.py.
+#
+# AlertActuator turns the per-tick predictions into an alarm state with
+# hysteresis: it raises after `raise_after` anomalous predictions in a row
+# and clears after `clear_after` normal ones. Pins are only written on
+# transitions (and on blink pattern edges, from a background thread), and
+# Telegram messages go through a bounded, rate-limited queue, so update()
+# never blocks the detection tick.
+#
+# tests/test_alerts.py covers it with mock pins and a local Telegram stand-in.
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+class Blinker:
+    """Drives output pins on a daemon thread while an alarm is active.
+
+    patterns: {pin: [on_sec, off_sec]}; an empty pattern means steady on.
+    """
+
+    def __init__(self, write, patterns):
+        self.write = write
+        self.patterns = patterns
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+
+    def _run(self):
+        now = time.monotonic()
+        # pin -> (level, next toggle time or None for steady)
+        state = {}
+        for pin, pattern in self.patterns.items():
+            self.write(pin, 1)
+            state[pin] = (1, now + pattern[0] if pattern else None)
+        while True:
+            due = [t for _, t in state.values() if t is not None]
+            timeout = max(0.0, min(due) - time.monotonic()) if due else None
+            if self.stop_event.wait(timeout):
+                break
+            now = time.monotonic()
+            for pin, (level, toggle_at) in state.items():
+                if toggle_at is None or toggle_at > now:
+                    continue
+                level = 1 - level
+                on_sec, off_sec = self.patterns[pin]
+                self.write(pin, level)
+                state[pin] = (level, toggle_at + (on_sec if level else off_sec))
+        for pin in self.patterns:
+            self.write(pin, 0)
+
+
+class TelegramNotifier:
+    """Sends messages from a daemon thread, at most one per `min_interval`
+    seconds; messages queued meanwhile are sent together. notify() never
+    blocks: when the queue is full the message is dropped and counted."""
+
+    def __init__(self, token, chat_id, api_base="https://api.telegram.org",
+                 min_interval=30.0, queue_size=20, timeout=10.0, metrics=None):
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.sent = 0
+        self.last_sent = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def notify(self, text):
+        try:
+            self.queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+            if self.metrics is not None:
+                self.metrics.inc("telegram_dropped")
+
+    def close(self, timeout=2.0):
+        """Flush what we can within `timeout`, then give up."""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            text = self.queue.get()
+            if text is None:
+                return
+            if self.last_sent is not None:
+                wait = self.last_sent + self.min_interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            # Batch whatever piled up while we were rate limited
+            texts, closing = [text], False
+            while True:
+                try:
+                    more = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    closing = True
+                    break
+                texts.append(more)
+            self._send("\n\n".join(texts))
+            self.last_sent = time.monotonic()
+            if closing:
+                return
+
+    def _send(self, text):
+        body = json.dumps({"chat_id": self.chat_id, "text": text}).encode()
+        for attempt in range(3):
+            req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    resp.read()
+                self.sent += 1
+                if self.metrics is not None:
+                    self.metrics.inc("telegram_sent")
+                return True
+            except urllib.error.HTTPError as e:
+                # 429: Telegram says how long to back off
+                retry_after = 2 ** attempt
+                if e.code == 429:
+                    try:
+                        retry_after = json.loads(e.read())["parameters"]["retry_after"]
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                elif e.code < 500:
+                    break
+                time.sleep(retry_after)
+            except (urllib.error.URLError, OSError):
+                time.sleep(2 ** attempt)
+        print("[WARN] Telegram alert could not be delivered")
+        if self.metrics is not None:
+            self.metrics.inc("telegram_errors")
+        return False
+
+
+class AlertActuator:
+    def __init__(self, gpio, pins, raise_after=2, clear_after=3, notifier=None, metrics=None):
+        """pins: {pin: [on_sec, off_sec] or []} for every enabled output."""
+        self.gpio = gpio
+        self.pins = pins
+        self.raise_after = raise_after
+        self.clear_after = clear_after
+        self.notifier = notifier
+        self.metrics = metrics
+        self.levels = {}
+        self.lock = threading.Lock()
+        self.active = False
+        self.run = 0          # consecutive predictions disagreeing with the current state
+        self.since = None
+        self.blinker = None
+        for pin in pins:
+            self._write(pin, 0)
+
+    def _write(self, pin, level):
+        with self.lock:
+            if self.levels.get(pin) == level:
+                return
+            self.levels[pin] = level
+        self.gpio.output(pin, self.gpio.HIGH if level else self.gpio.LOW)
+        if self.metrics is not None:
+            self.metrics.inc("gpio_writes")
+
+    def update(self, pred, timestamp, reading=None, score=None):
+        """Feed one prediction (-1 anomaly, 1 normal); returns "raised",
+        "cleared" or None. Never blocks on pins or the network."""
+        if (pred == -1) != self.active:
+            self.run += 1
+        else:
+            self.run = 0
+        if not self.active and self.run >= self.raise_after:
+            self._raise(timestamp, reading, score)
+            return "raised"
+        if self.active and self.run >= self.clear_after:
+            self._clear(timestamp)
+            return "cleared"
+        return None
+
+    def _raise(self, timestamp, reading, score):
+        self.active, self.run, self.since = True, 0, timestamp
+        if self.pins:
+            self.blinker = Blinker(self._write, self.pins)
+            self.blinker.start()
+        if self.notifier is not None:
+            text = f"🚨 Anomaly detected at {timestamp:%Y-%m-%d %H:%M:%S}"
+            if reading is not None:
+                temp, hum, motion = reading
+                text += f"\nTemp: {temp}°C | Humidity: {hum}% | Motion: {motion}"
+            if score is not None:
+                text += f"\nScore: {score:.3f}"
+            self.notifier.notify(text)
+
+    def _clear(self, timestamp):
+        self.active, self.run = False, 0
+        self._stop_blinker()
+        if self.notifier is not None:
+            duration = int((timestamp - self.since).total_seconds())
+            self.notifier.notify(f"✅ Back to normal at {timestamp:%Y-%m-%d %H:%M:%S} after {duration}s")
+
+    def _stop_blinker(self):
+        if self.blinker is not None:
+            # Stopping joins a thread that only ever waits on its event
+            self.blinker.stop()
+            self.blinker = None
+
+    def close(self):
+        self._stop_blinker()
+        for pin in self.pins:
+            self._write(pin, 0)
+        if self.notifier is not None:
+            self.notifier.close()
+
+
+def alerts_from_config(config, gpio, metrics=None):
+    """AlertActuator for the ALERTS section of config.json."""
+    settings = config.get("ALERTS", {})
+    pins = {}
+    if settings.get("use_buzzer", False):
+        pins[config["GPIO"]["BUZZER_PIN"]] = settings.get("buzzer_pattern", [])
+    if settings.get("use_led", False):
+        pins[config["GPIO"]["LED_PIN"]] = settings.get("led_pattern", [])
+
+    notifier = None
+    if settings.get("use_telegram", False):
+        if settings.get("telegram_bot_token") and settings.get("telegram_chat_id"):
+            notifier = TelegramNotifier(
+                settings["telegram_bot_token"], settings["telegram_chat_id"],
+                settings.get("telegram_api_base", "https://api.telegram.org"),
+                settings.get("telegram_min_interval_sec", 30),
+                settings.get("telegram_queue_size", 20),
+                metrics=metrics,
+            )
+        else:
+            print("[WARN] use_telegram is on but the bot token or chat id is missing")
+
+    return AlertActuator(gpio, pins, settings.get("raise_after", 2),
+                         settings.get("clear_after", 3), notifier, metrics)
+
@@ -0,0 +1,361 @@
+# archive.py
+# Compressed archival tier for cold sensor history.
+#
+# Closed days of data/sensor_log.csv and data/anomaly_log.csv are moved
+# into one compressed segment per day under LOGGING.archive_dir:
+#   Timestamp              delta-of-delta seconds, zigzag, smallest int type
+#   float columns          fixed-point deltas when the values allow it
+#                          (DHT readings do), XOR of float64 bits otherwise
+#   integer columns        run-length encoded (Motion, Prediction)
+# and every stream is zlib-compressed. Decoding is a handful of numpy
+# cumsum/repeat calls per segment.
+#
+#   python archive.py compact     move closed days out of the CSV logs
+#   python archive.py bench       compression ratio and decode throughput
+import io
+import json
+import math
+import os
+import struct
+import sys
+import time
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from log_lock import log_lock
+
+MAGIC = b"HSZ1"
+SEGMENT_EXT = ".hsz"
+
+
+# ---------- integer helpers ----------
+
+def _zigzag(x):
+    x = x.astype(np.int64)
+    return ((x << 1) ^ (x >> 63)).astype(np.uint64)
+
+
+def _unzigzag(z):
+    z = z.astype(np.uint64)
+    return ((z >> np.uint64(1)).astype(np.int64)) ^ -((z & np.uint64(1)).astype(np.int64))
+
+
+def _pack_uint(z):
+    # Store unsigned ints in the smallest dtype that holds them
+    top = int(z.max()) if len(z) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if top <= np.iinfo(dtype).max:
+            return np.dtype(dtype).str, z.astype(dtype).tobytes()
+
+
+def _unpack_uint(dtype, raw):
+    return np.frombuffer(raw, dtype=np.dtype(dtype)).astype(np.uint64)
+
+
+# ---------- column codecs ----------
+
+def _encode_time(values):
+    secs = values.astype("datetime64[s]").astype(np.int64)
+    first = int(secs[0]) if len(secs) else 0
+    deltas = np.diff(secs, prepend=first)           # deltas[0] == 0
+    dod = np.diff(deltas, prepend=0)
+    dtype, raw = _pack_uint(_zigzag(dod))
+    return {"codec": "dod", "first": first, "dtype": dtype}, [raw]
+
+
+def _decode_time(meta, streams):
+    dod = _unzigzag(_unpack_uint(meta["dtype"], streams[0]))
+    secs = meta["first"] + np.cumsum(np.cumsum(dod))
+    return secs.astype("datetime64[s]")
+
+
+def _fixed_point_scale(values):
+    # Smallest power of ten that makes every finite value an exact integer
+    finite = values[np.isfinite(values)]
+    for decimals in range(4):
+        scaled = np.round(finite * 10 ** decimals)
+        if np.array_equal(scaled / 10 ** decimals, finite) and np.abs(scaled).max(initial=0) < 2 ** 52:
+            return decimals
+    return None
+
+
+def _encode_float(values):
+    values = values.astype(np.float64)
+    missing = np.isnan(values)
+    meta = {"missing": bool(missing.any())}
+    streams = [np.packbits(missing).tobytes()] if meta["missing"] else []
+
+    decimals = _fixed_point_scale(values)
+    if decimals is not None:
+        # Carry the previous value through gaps so they cost a zero delta
+        filled = pd.Series(values).ffill().fillna(0).to_numpy()
+        ints = np.round(filled * 10 ** decimals).astype(np.int64)
+        dtype, raw = _pack_uint(_zigzag(np.diff(ints, prepend=0)))
+        meta.update(codec="delta", decimals=decimals, dtype=dtype)
+    else:
+        bits = values.view(np.uint64)
+        xored = bits ^ np.concatenate(([np.uint64(0)], bits[:-1]))
+        raw = xored.tobytes()
+        meta.update(codec="xor")
+    return meta, streams + [raw]
+
+
+def _decode_float(meta, streams, rows):
+    if meta["missing"]:
+        missing = np.unpackbits(np.frombuffer(streams[0], dtype=np.uint8), count=rows).astype(bool)
+        streams = streams[1:]
+    if meta["codec"] == "delta":
+        ints = np.cumsum(_unzigzag(_unpack_uint(meta["dtype"], streams[0])))
+        values = ints / 10 ** meta["decimals"]
+    else:
+        values = np.bitwise_xor.accumulate(np.frombuffer(streams[0], dtype=np.uint64)).view(np.float64)
+    if meta["missing"]:
+        values = values.copy()
+        values[missing] = np.nan
+    return values
+
+
+def _encode_rle(values):
+    values = values.astype(np.int64)
+    if len(values):
+        starts = np.flatnonzero(np.diff(values, prepend=values[0] - 1))
+        runs = np.diff(np.append(starts, len(values)))
+        run_values = values[starts]
+    else:
+        runs = run_values = np.array([], dtype=np.int64)
+    vtype, vraw = _pack_uint(_zigzag(run_values))
+    rtype, rraw = _pack_uint(runs.astype(np.uint64))
+    return {"codec": "rle", "value_dtype": vtype, "run_dtype": rtype}, [vraw, rraw]
+
+
+def _decode_rle(meta, streams):
+    values = _unzigzag(_unpack_uint(meta["value_dtype"], streams[0]))
+    runs = _unpack_uint(meta["run_dtype"], streams[1]).astype(np.int64)
+    return np.repeat(values, runs)
+
+
+# ---------- segments ----------
+
+def encode_segment(df):
+    """Encode a log DataFrame (Timestamp + sensor columns) to bytes."""
+    columns, payload = [], []
+    for name in df.columns:
+        col = df[name]
+        if name == "Timestamp":
+            meta, streams = _encode_time(pd.to_datetime(col).to_numpy())
+        elif pd.api.types.is_integer_dtype(col):
+            meta, streams = _encode_rle(col.to_numpy())
+        else:
+            meta, streams = _encode_float(pd.to_numeric(col, errors="coerce").to_numpy())
+        meta["name"] = name
+        meta["streams"] = []
+        for raw in streams:
+            packed = zlib.compress(raw, 9)
+            meta["streams"].append(len(packed))
+            payload.append(packed)
+        columns.append(meta)
+
+    header = json.dumps({"rows": len(df), "columns": columns}).encode()
+    return MAGIC + struct.pack("<I", len(header)) + header + b"".join(payload)
+
+
+def decode_segment(blob):
+    """Inverse of encode_segment(); returns a DataFrame."""
+    if blob[:4] != MAGIC:
+        raise ValueError("Not an archive segment")
+    (header_len,) = struct.unpack("<I", blob[4:8])
+    header = json.loads(blob[8:8 + header_len])
+    rows = header["rows"]
+    pos = 8 + header_len
+
+    data = {}
+    for meta in header["columns"]:
+        streams = []
+        for size in meta["streams"]:
+            streams.append(zlib.decompress(blob[pos:pos + size]))
+            pos += size
+        if meta["codec"] == "dod":
+            data[meta["name"]] = _decode_time(meta, streams)
+        elif meta["codec"] == "rle":
+            data[meta["name"]] = _decode_rle(meta, streams)
+        else:
+            data[meta["name"]] = _decode_float(meta, streams, rows)
+    return pd.DataFrame(data)
+
+
+def segment_dir(archive_dir, log_file):
+    return os.path.join(archive_dir, os.path.splitext(os.path.basename(log_file))[0])
+
+
+def list_segments(archive_dir, log_file):
+    """[(day, path)] of archived segments for a log, oldest first."""
+    folder = segment_dir(archive_dir, log_file)
+    if not os.path.isdir(folder):
+        return []
+    out = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(SEGMENT_EXT):
+            out.append((date.fromisoformat(name[:-len(SEGMENT_EXT)]), os.path.join(folder, name)))
+    return out
+
+
+def iter_segments(archive_dir, log_file, start=None, end=None):
+    """Stream archived rows one day at a time, restricted to [start, end]."""
+    for day, path in list_segments(archive_dir, log_file):
+        if start is not None and day < pd.Timestamp(start).date():
+            continue
+        if end is not None and day > pd.Timestamp(end).date():
+            break
+        with open(path, "rb") as f:
+            df = decode_segment(f.read())
+        if start is not None:
+            df = df[df["Timestamp"] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df["Timestamp"] <= pd.Timestamp(end)]
+        yield df
+
+
+def read_range(archive_dir, log_file, start=None, end=None):
+    """Archived history plus the live CSV for [start, end] as one DataFrame."""
+    parts = list(iter_segments(archive_dir, log_file, start, end))
+    if os.path.exists(log_file):
+        live = pd.read_csv(log_file)
+        live["Timestamp"] = pd.to_datetime(live["Timestamp"])
+        if start is not None:
+            live = live[live["Timestamp"] >= pd.Timestamp(start)]
+        if end is not None:
+            live = live[live["Timestamp"] <= pd.Timestamp(end)]
+        if not live.empty:
+            parts.append(live)
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True)
+
+
+def read_recent(archive_dir, log_file, hours):
+    """The last `hours` of archived history, without the live CSV.
+
+    For live views that tail the CSV themselves: after compaction moves the
+    closed days out, this brings back the part of them they still show."""
+    segments = list_segments(archive_dir, log_file)
+    if not segments or hours <= 0:
+        return pd.DataFrame()
+    first_day = segments[-1][0] - timedelta(days=math.ceil(hours / 24))
+    df = pd.concat(list(iter_segments(archive_dir, log_file, start=first_day)), ignore_index=True)
+    if df.empty:
+        return df
+    return df[df["Timestamp"] >= df["Timestamp"].iloc[-1] - pd.Timedelta(hours=hours)]
+
+
+# ---------- compaction ----------
+
+def compact(log_file, archive_dir, today=None):
+    """Move every closed day (before `today`) of `log_file` into the archive.
+
+    The loggers reopen the CSV in append mode on every tick, so the file is
+    replaced atomically and anything appended while we worked is carried
+    over; the final copy and the replace happen under log_lock(), which
+    the loggers also hold while appending. Returns the number of rows archived.
+    """
+    if not os.path.exists(log_file):
+        return 0
+    today = (today or date.today()).isoformat()
+
+    with open(log_file, "rb") as f:
+        content = f.read()
+    header, _, body = content.partition(b"\n")
+    closed, keep = {}, []
+    for line in body.splitlines(keepends=True):
+        day = line[:10].decode(errors="replace")
+        if line.strip() and day < today:
+            closed.setdefault(day, []).append(line)
+        else:
+            keep.append(line)
+    if not closed:
+        return 0
+
+    folder = segment_dir(archive_dir, log_file)
+    os.makedirs(folder, exist_ok=True)
+    archived = 0
+    for day, lines in sorted(closed.items()):
+        df = pd.read_csv(io.BytesIO(header + b"\n" + b"".join(lines)))
+        path = os.path.join(folder, day + SEGMENT_EXT)
+        if os.path.exists(path):
+            # Late rows for an already archived day: merge them in
+            with open(path, "rb") as f:
+                old = decode_segment(f.read())
+            df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+            df = pd.concat([old, df], ignore_index=True).sort_values("Timestamp", kind="stable")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_segment(df))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        archived += len(lines)
+
+    tmp = log_file + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header + b"\n" + b"".join(keep))
+        # Rows appended since we read the file; no appends until the swap
+        with log_lock(log_file):
+            with open(log_file, "rb") as live:
+                live.seek(len(content))
+                f.write(live.read())
+            f.flush()
+            os.replace(tmp, log_file)
+    return archived
+
+
+def _bench(log_file, rows=1_000_000):
+    base = pd.read_csv(log_file)
+    base["Timestamp"] = pd.to_datetime(base["Timestamp"])
+
+    # Storage on the real log (tiling it would flatter zlib)
+    with open(log_file, "rb") as f:
+        csv_bytes = len(f.read())
+    blob = encode_segment(base)
+    print(f"Rows:        {len(base):,}")
+    print(f"CSV:         {csv_bytes / len(base):.1f} bytes/row")
+    print(f"Archive:     {len(blob) / len(base):.2f} bytes/row ({csv_bytes / len(blob):.0f}x smaller)")
+
+    # Decode throughput on the log repeated out to `rows` rows
+    reps = rows // len(base) + 1
+    span = base["Timestamp"].iloc[-1] - base["Timestamp"].iloc[0] + pd.Timedelta(seconds=2)
+    df = pd.concat(
+        [base.assign(Timestamp=base["Timestamp"] + i * span) for i in range(reps)],
+        ignore_index=True,
+    ).iloc[:rows]
+    blob = encode_segment(df)
+    start = time.perf_counter()
+    out = decode_segment(blob)
+    elapsed = time.perf_counter() - start
+
+    same = all(
+        np.array_equal(out[c].to_numpy(), df[c].to_numpy(), equal_nan=c != "Timestamp")
+        for c in df.columns
+    )
+    print(f"Decode:      {len(df) / elapsed / 1e6:.1f} M rows/s ({len(df):,} rows)")
+    print(f"Round trip:  {'OK' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    with open("config.json") as f:
+        CONFIG = json.load(f)
+    ARCHIVE_DIR = CONFIG["LOGGING"]["archive_dir"]
+    logs = [CONFIG["LOGGING"]["log_file"], CONFIG["LOGGING"]["anomaly_log_file"]]
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    if command == "compact":
+        for log in logs:
+            n = compact(log, ARCHIVE_DIR)
+            print(f"🗜️  {log}: archived {n} rows")
+    elif command == "bench":
+        for log in logs:
+            print(f"\n{log}")
+            _bench(log)
+    else:
+        print("usage: python archive.py [compact|bench]")
@@ -2,30 +2,148 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import time
 import json
-import joblib
-from sklearn.preprocessing import StandardScaler
+import threading
+import bisect
+from collections import deque
+import os
+from datetime import datetime, timedelta
+from episodes import load_episodes
+from archive import read_recent
+from live_export import CsvTail, num
 
 # Load config file
 with open("config.json") as f:
     config = json.load(f)
 
 data_file = config["LOGGING"]["anomaly_log_file"]
-model_path = config["MODEL"]["model_path"]
+archive_dir = config["LOGGING"]["archive_dir"]
+episode_file = config["LOGGING"]["episode_log_file"]
+trace_every = config["LOGGING"].get("trace_every", 1)
+refresh_sec = config["LOGGING"]["interval_sec"]
+max_points = config.get("DASHBOARD", {}).get("max_points", 5000)  # plotted per trace
+max_hours = config.get("DASHBOARD", {}).get("max_hours", 24)      # time range slider limit
+chart_height = 800
+snapshot_ttl = config.get("DASHBOARD", {}).get("snapshot_ttl_sec", 3 * refresh_sec)
 
-# Load trained model and scaler using joblib
-with open(model_path, 'rb') as f:
-    model_data = joblib.load(f)
+# Enough rows for the longest selectable range at the fastest rate the
+# detector logs at (its burst interval when the scheduler is adaptive)
+scheduler_settings = config.get("SCHEDULER", {})
+fastest_sec = refresh_sec
+if scheduler_settings.get("adaptive", False):
+    fastest_sec = min(refresh_sec, scheduler_settings.get("min_interval_sec", refresh_sec))
+retained_rows = int(max_hours * 3600 / fastest_sec) + 1
 
-model = model_data["model"]
-scaler = model_data["scaler"]
+# Bounded, incrementally extended view of the log.
+# Only rows appended since the last refresh are read; memory is capped at
+# retained_rows rows however long the dashboard stays up. When the log is
+# replaced (compaction, or at start-up) the rows already archived are read
+# back from the archive, so the longest range stays filled.
+# Anomalies are the detector's own decisions (the Prediction column), not a
+# re-scoring: with LOGGING.trace_every = N the log holds every Nth normal
+# tick plus all anomalous ones, too sparse for the model's rolling features.
+class LiveSeries:
+    def __init__(self, path, max_rows, archive_dir, history_hours):
+        self.tail = CsvTail(path)
+        self.max_rows = max_rows
+        self.archive_dir = archive_dir
+        self.history_hours = history_hours
+        self.reset()
 
-# Load data function
-def load_data():
-    df = pd.read_csv(data_file)
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-    return df
+    def reset(self):
+        self.rows = deque(maxlen=self.max_rows)  # (time, temp, hum, motion, prediction)
+
+    def poll(self):
+        """Returns True if the rows changed."""
+        if not self.tail.changed():
+            return False
+        new_rows, replaced = self.tail.read_new()
+        if replaced:
+            self.reset()
+            history = read_recent(self.archive_dir, self.tail.path, self.history_hours)
+            new_rows = history.to_dict("records") + new_rows
+
+        for r in new_rows:
+            values = [num(r.get(k)) for k in ('Temperature', 'Humidity', 'Motion', 'Prediction')]
+            if None in values:
+                continue
+            temp, hum, motion, pred = values
+            self.rows.append((pd.Timestamp(r['Timestamp']), temp, hum, motion, int(pred)))
+        return True
+
+# One immutable copy of the rows, shared by every session until the next one.
+# The chart for each (time range, anomaly toggle) is built and serialized once
+# per snapshot, by whichever session asks first, and reused by all the others.
+class Snapshot:
+    def __init__(self, version, rows):
+        self.version = version
+        self.produced_at = time.monotonic()
+        self.rows = tuple(rows)
+        self.times = [r[0] for r in self.rows]
+        self.charts = {}  # (hours, show_anomalies) -> figure
+        self.charts_lock = threading.Lock()
+
+    def window(self, hours):
+        if not self.rows:
+            return []
+        start = self.times[-1] - timedelta(hours=hours)
+        return self.rows[bisect.bisect_left(self.times, start):]
+
+    def chart(self, hours, show_anomalies):
+        view = (hours, show_anomalies)
+        with self.charts_lock:
+            if view not in self.charts:
+                fig = make_figure()
+                update_figure(fig, thin(self.window(hours), max_points), show_anomalies)
+                self.charts[view] = fig
+            return self.charts[view]
+
+# Every anomaly, but at most max_points of the regular samples per trace
+def thin(rows, limit):
+    step = -(-len(rows) // limit) if limit else 1
+    if step <= 1:
+        return rows
+    return [r for i, r in enumerate(rows) if i % step == 0 or r[4] == -1]
+
+# Single producer for all browser sessions: a background thread reads and
+# snapshots the log once per refresh interval, and sessions
+# only filter the latest snapshot. If the thread falls behind by more than
+# the TTL, the next reader refreshes inline.
+class SnapshotProducer:
+    def __init__(self, path, retained_rows, interval, ttl):
+        self.series = LiveSeries(path, retained_rows, archive_dir, max_hours)
+        self.interval = interval
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.snapshot = Snapshot(0, [])
+        self.refresh()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def refresh(self):
+        with self.lock:
+            if self.series.poll():
+                self.snapshot = Snapshot(self.snapshot.version + 1, self.series.rows)
+            else:
+                self.snapshot.produced_at = time.monotonic()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[WARN] Dashboard refresh failed: {e}")
+
+    def get(self):
+        if time.monotonic() - self.snapshot.produced_at > self.ttl:
+            self.refresh()
+        return self.snapshot
+
+@st.cache_resource
+def shared_producer():
+    return SnapshotProducer(data_file, retained_rows, refresh_sec, snapshot_ttl)
 
 # Streamlit layout enhancements
 st.set_page_config(page_title="Real-Time Sensor Dashboard", layout="wide")
@@ -34,20 +152,11 @@ st.markdown("<h1 style='text-align: center; color: #FF5733;'>📊 Real-Time Sens
 # Sidebar Styling and Controls
 st.sidebar.title("Dashboard Controls")
 st.sidebar.markdown("Explore real-time sensor data and anomalies.")
-time_range = st.sidebar.slider("Select time range", 1, 24, 2, 1)  # hours
+time_range = st.sidebar.slider("Select time range", 1, max_hours, min(2, max_hours), 1)  # hours
 anomaly_toggle = st.sidebar.checkbox("Show Anomalies", True)
 
-# Plot function with improved styling
-def plot_graph(df):
-    # Convert Timestamp to a more readable format: HH:MM (hours:minutes)
-    df['Time'] = df['Timestamp'].dt.strftime('%H:%M')  # This will show time in Hours:Minutes
-
-    # Scale the data for prediction
-    scaled_data = scaler.transform(df[['Temperature', 'Humidity', 'Motion']])
-
-    # Predict anomalies using the Isolation Forest model
-    df['is_anomaly'] = model.predict(scaled_data)
-
+# Empty chart layout; update_figure fills in the data
+def make_figure():
     fig = make_subplots(
         rows=3, cols=1,
         shared_xaxes=True,
@@ -61,7 +170,6 @@ def plot_graph(df):
 
     # Temperature Plot
     fig.add_trace(go.Scatter(
-        x=df['Time'], y=df['Temperature'],
         mode='lines+markers', name='Temperature',
         line=dict(color='orange', width=2, dash='solid'),
         marker=dict(size=8, color='orange', opacity=0.6)
@@ -69,7 +177,6 @@ def plot_graph(df):
 
     # Humidity Plot
     fig.add_trace(go.Scatter(
-        x=df['Time'], y=df['Humidity'],
         mode='lines+markers', name='Humidity',
         line=dict(color='blue', width=2, dash='solid'),
         marker=dict(size=8, color='blue', opacity=0.6)
@@ -77,50 +184,76 @@ def plot_graph(df):
 
     # Motion Plot
     fig.add_trace(go.Scatter(
-        x=df['Time'], y=df['Motion'],
         mode='lines+markers', name='Motion',
         line=dict(color='green', width=2, dash='solid'),
         marker=dict(size=8, color='green', opacity=0.6)
     ), row=3, col=1)
 
-    # Highlight Anomalies if toggle is checked
-    if anomaly_toggle:
-        anomalies = df[df['is_anomaly'] == -1]  # Isolation Forest uses -1 for anomalies
-        fig.add_trace(go.Scatter(
-            x=anomalies['Time'], y=anomalies['Temperature'],
-            mode='markers', name='Anomalies',
-            marker=dict(size=12, color='red', symbol='x', opacity=0.9)
-        ), row=1, col=1)
-
-        fig.add_trace(go.Scatter(
-            x=anomalies['Time'], y=anomalies['Humidity'],
-            mode='markers', name='Anomalies',
-            marker=dict(size=12, color='red', symbol='x', opacity=0.9)
-        ), row=2, col=1)
-
+    # Anomaly markers, one trace per panel
+    for row in (1, 2, 3):
         fig.add_trace(go.Scatter(
-            x=anomalies['Time'], y=anomalies['Motion'],
-            mode='markers', name='Anomalies',
+            mode='markers', name='Anomalies', showlegend=row == 1,
             marker=dict(size=12, color='red', symbol='x', opacity=0.9)
-        ), row=3, col=1)
+        ), row=row, col=1)
 
     # Update Layout
     fig.update_layout(
-        height=800,
+        height=chart_height,
         width=1000,
         title="📊 Live Sensor Monitoring (Temperature, Humidity, Motion)",
         xaxis_title="Time (HH:MM)",  # X-axis title updated
         template="plotly_dark",  # Dark background for contrast
-        showlegend=True
+        showlegend=True,
+        uirevision="live"  # keep zoom/pan across refreshes
     )
+    fig.update_xaxes(tickformat="%H:%M")
+    return fig
 
-    # Pass a unique key to each chart to avoid duplicate element ID error
-    st.plotly_chart(fig, use_container_width=True, key=str(time.time()))  # Unique key using timestamp
+# numpy columns serialize far faster than lists of Timestamps and floats
+def update_figure(fig, rows, show_anomalies):
+    times = np.array([r[0] for r in rows], dtype="datetime64[ms]")
+    values = np.array([r[1:4] for r in rows], dtype=float).reshape(-1, 3)
+    anomalies = np.array([r[4] == -1 for r in rows], dtype=bool)  # Isolation Forest uses -1 for anomalies
+    for i in range(3):
+        fig.data[i].x = times
+        fig.data[i].y = values[:, i]
+        fig.data[i + 3].x = times[anomalies]
+        fig.data[i + 3].y = values[anomalies, i]
+        fig.data[i + 3].visible = show_anomalies
 
-# Streamlit real-time loop
-st.markdown("### 📈 Live Data and Anomalies")
-while True:
-    df = load_data()
+# Episode log only changes when an incident closes; re-read it only then
+@st.cache_data(max_entries=1)
+def cached_episodes(mtime):
+    return load_episodes(episode_file)
+
+def show_incidents():
+    mtime = os.path.getmtime(episode_file) if os.path.exists(episode_file) else 0
+    df = cached_episodes(mtime)
+    now = datetime.now()
+    day, week = st.columns(2)
+    day.metric("Incidents (24h)", int((df["End"] >= now - timedelta(days=1)).sum()))
+    week.metric("Incidents (7 days)", int((df["End"] >= now - timedelta(days=7)).sum()))
     if not df.empty:
-        plot_graph(df)
-    time.sleep(config["LOGGING"]["interval_sec"])
+        st.dataframe(
+            df[["Start", "End", "DurationSec", "Ticks", "PeakScore", "MeanScore",
+                "Temperature", "Humidity", "Motion"]].tail(20).iloc[::-1],
+            use_container_width=True, hide_index=True,
+        )
+
+# Streamlit real-time view: only this fragment reruns, and the chart keeps
+# one fixed key so it is updated in place instead of piling up elements
+st.markdown("### 📈 Live Data and Anomalies")
+
+@st.fragment(run_every=refresh_sec)
+def live_chart():
+    if trace_every <= 0:
+        st.info("The detector keeps no per-tick trace (LOGGING.trace_every is 0), "
+                "so only the anomaly episodes below are live.")
+    else:
+        # Sessions keep no chart state; the figure comes ready-made from the snapshot
+        fig = shared_producer().get().chart(time_range, anomaly_toggle)
+        st.plotly_chart(fig, use_container_width=True, key="live_chart")
+    st.markdown("### 🚨 Anomaly Episodes")
+    show_incidents()
+
+live_chart()
@@ -0,0 +1,165 @@
+# episodes.py
+# Episode-level anomaly log: one row per incident instead of one per tick.
+#
+# Consecutive anomalous predictions form an episode. When it ends we append
+# its start, end, duration, peak and mean decision_function score (lower
+# = more anomalous) and the readings/features at the peak. Incident
+# queries then read a file that grows with incidents, not with uptime.
+import csv
+import os
+
+import pandas as pd
+
+from features import FEATURE_COLUMNS
+
+EPISODE_COLUMNS = [
+    "Start", "End", "DurationSec", "Ticks", "PeakScore", "MeanScore",
+    "PeakTime", "Temperature", "Humidity", "Motion",
+] + FEATURE_COLUMNS
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class EpisodeTracker:
+    """Feed it every scored tick; writes a row when an episode closes.
+
+    An episode closes after `close_after` consecutive normal ticks, so a
+    single normal reading inside an incident doesn't split it in two.
+    """
+
+    def __init__(self, path, close_after=1):
+        self.path = path
+        self.close_after = close_after
+        self.current = None
+        self.normal_run = 0
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(EPISODE_COLUMNS)
+
+    def update(self, timestamp, score, reading, features):
+        """reading = (temp, hum, motion); returns the closed episode dict, if any."""
+        if score < 0:
+            self.normal_run = 0
+            ep = self.current
+            if ep is None:
+                ep = self.current = {
+                    "start": timestamp, "ticks": 0, "score_sum": 0.0,
+                    "peak_score": float("inf"),
+                }
+            ep["end"] = timestamp
+            ep["ticks"] += 1
+            ep["score_sum"] += score
+            if score < ep["peak_score"]:
+                ep.update(peak_score=score, peak_time=timestamp,
+                          peak_reading=tuple(reading), peak_features=list(features))
+            return None
+
+        if self.current is not None:
+            self.normal_run += 1
+            if self.normal_run >= self.close_after:
+                return self.close()
+        return None
+
+    def close(self):
+        """Write out the open episode (also call on shutdown)."""
+        ep, self.current = self.current, None
+        self.normal_run = 0
+        if ep is None:
+            return None
+        row = {
+            "Start": ep["start"].strftime(TIME_FORMAT),
+            "End": ep["end"].strftime(TIME_FORMAT),
+            "DurationSec": int((ep["end"] - ep["start"]).total_seconds()),
+            "Ticks": ep["ticks"],
+            "PeakScore": round(ep["peak_score"], 5),
+            "MeanScore": round(ep["score_sum"] / ep["ticks"], 5),
+            "PeakTime": ep["peak_time"].strftime(TIME_FORMAT),
+            "Temperature": ep["peak_reading"][0],
+            "Humidity": ep["peak_reading"][1],
+            "Motion": ep["peak_reading"][2],
+        }
+        row.update({name: round(v, 5) for name, v in zip(FEATURE_COLUMNS, ep["peak_features"])})
+        with open(self.path, "a", newline="") as f:
+            csv.writer(f).writerow([row[c] for c in EPISODE_COLUMNS])
+        return row
+
+
+class TraceSampler:
+    """Decides which ticks go to the per-tick trace (anomaly_log.csv).
+
+    every=1 logs every tick (the old behaviour), every=N logs every Nth
+    normal tick plus all anomalous ones, every=0 turns the trace off.
+    """
+
+    def __init__(self, every):
+        self.every = every
+        self.count = 0
+
+    def keep(self, pred):
+        if self.every <= 0:
+            return False
+        self.count += 1
+        return pred == -1 or self.count % self.every == 0
+
+
+def load_episodes(path, start=None, end=None):
+    """Episodes overlapping [start, end], oldest first."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+    df = pd.read_csv(path, parse_dates=["Start", "End", "PeakTime"])
+    if start is not None:
+        df = df[df["End"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Start"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+def count_episodes(path, since):
+    return len(load_episodes(path, start=since))
+
+
+def backfill(trace_file, model_data, path):
+    """Rebuild the episode log from a per-tick trace (anomaly_log.csv)."""
+    from features import compute_features
+
+    df = pd.read_csv(trace_file).dropna()
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    feats = compute_features(df, model_data["window_sec"])
+    X = feats[FEATURE_COLUMNS].to_numpy()
+    scores = model_data["model"].decision_function(model_data["scaler"].transform(X))
+
+    if os.path.exists(path):
+        os.remove(path)
+    tracker = EpisodeTracker(path)
+    rows = df.loc[feats.index, ["Timestamp", "Temperature", "Humidity", "Motion"]]
+    for (ts, temp, hum, motion), score, x in zip(rows.itertuples(index=False), scores, X):
+        tracker.update(ts.to_pydatetime(), score, (temp, hum, motion), x)
+    tracker.close()
+
+
+# Incident report: python episodes.py [backfill]
+if __name__ == "__main__":
+    import json
+    import sys
+    from datetime import datetime, timedelta
+
+    with open("config.json") as f:
+        CONFIG = json.load(f)
+    EPISODE_LOG = CONFIG["LOGGING"]["episode_log_file"]
+
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        import joblib
+        from features import check_model_features
+
+        model_data = joblib.load(CONFIG["MODEL"]["model_path"])
+        check_model_features(model_data)
+        backfill(CONFIG["LOGGING"]["anomaly_log_file"], model_data, EPISODE_LOG)
+        print(f"✅ Episodes rebuilt into {EPISODE_LOG}")
+
+    now = datetime.now()
+    print(f"Incidents in the last 24h: {count_episodes(EPISODE_LOG, now - timedelta(days=1))}")
+    print(f"Incidents in the last 7 days: {count_episodes(EPISODE_LOG, now - timedelta(days=7))}")
+    recent = load_episodes(EPISODE_LOG).tail(10)
+    if not recent.empty:
+        print(recent[["Start", "DurationSec", "Ticks", "PeakScore", "MeanScore"]].to_string(index=False))
@@ -0,0 +1,206 @@
+# feature_cache.py
+# On-disk, incrementally extended training feature matrix.
+#
+# train_model.py used to re-read the whole sensor history and recompute
+# every rolling feature on each run. The cleaned feature matrix is now kept
+# as a raw float64 array (features.f64) plus meta.json, keyed by the log,
+# the feature window and the feature definition. A run only parses rows
+# appended since the last one; the last window of raw rows is kept in the
+# meta so features right after the boundary come out exactly as a full
+# recompute would.
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from archive import decode_segment, iter_segments, list_segments
+from features import FEATURE_COLUMNS, FEATURE_VERSION, compute_features
+
+RAW = ["Timestamp", "Temperature", "Humidity", "Motion"]
+
+
+def _cache_key(log_file, archive_dir, window_sec):
+    ident = {
+        "feature_version": FEATURE_VERSION,
+        "features": FEATURE_COLUMNS,
+        "window_sec": window_sec,
+        "log_file": os.path.abspath(log_file),
+        "archive_dir": os.path.abspath(archive_dir),
+    }
+    return hashlib.sha1(json.dumps(ident, sort_keys=True).encode()).hexdigest()
+
+
+def _first_line(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        f.readline()  # header
+        return f.readline().decode(errors="replace")
+
+
+def _history_start(archive_dir, log_file):
+    # Oldest timestamp anywhere in the history: changes if the log is swapped out
+    segments = list_segments(archive_dir, log_file)
+    if segments:
+        with open(segments[0][1], "rb") as f:
+            return str(decode_segment(f.read())["Timestamp"].iloc[0])
+    line = _first_line(log_file)
+    return str(pd.Timestamp(line.split(",")[0])) if line.strip() else ""
+
+
+def _complete_lines(path, start=0):
+    """(header, data, offset): the complete lines from byte `start` on (or
+    after the header), and the offset just past the last newline read. A
+    half-written last line is left for the next run."""
+    if not os.path.exists(path):
+        return b"", b"", 0
+    with open(path, "rb") as f:
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return b"", b"", 0
+        if start:
+            f.seek(start)
+        else:
+            start = f.tell()
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    return header, data[:end], start + end
+
+
+def _parse(header, data):
+    if not data:
+        return pd.DataFrame(columns=RAW)
+    return pd.read_csv(io.BytesIO(header + data))
+
+
+def _clean(df):
+    df = df[RAW].dropna().copy()
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    return df.reset_index(drop=True)
+
+
+class FeatureCache:
+    def __init__(self, cache_dir, log_file, archive_dir, window_sec):
+        self.cache_dir = cache_dir
+        self.log_file = log_file
+        self.archive_dir = archive_dir
+        self.window_sec = window_sec
+        self.data_path = os.path.join(cache_dir, "features.f64")
+        self.meta_path = os.path.join(cache_dir, "meta.json")
+        self.key = _cache_key(log_file, archive_dir, window_sec)
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.data_path):
+            return None
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta.get("key") != self.key or meta.get("last_ts") is None:
+            return None
+        if meta.get("history_start") != _history_start(self.archive_dir, self.log_file):
+            return None
+        return meta
+
+    def load(self):
+        """Returns (X, stats): the full feature matrix, extended with new rows."""
+        meta = self._load_meta()
+        if meta is None:
+            return self._rebuild()
+
+        new_raw, offset = self._new_rows(meta)
+        added = 0
+        if not new_raw.empty:
+            tail = pd.DataFrame(meta["tail"], columns=RAW)
+            tail["Timestamp"] = pd.to_datetime(tail["Timestamp"])
+            combined = pd.concat([tail, new_raw], ignore_index=True)
+            feats = compute_features(combined, self.window_sec)
+            # Rows up to len(tail) were emitted by an earlier run
+            new_feats = feats[feats.index >= len(tail)][FEATURE_COLUMNS].to_numpy()
+            added = self._append(new_feats, meta["rows"])
+            meta["rows"] += added
+            meta["tail"] = self._tail(combined)
+            meta["last_ts"] = str(combined["Timestamp"].iloc[-1])
+        meta["csv_offset"] = offset
+        meta["csv_first_line"] = _first_line(self.log_file)
+        self._write_meta(meta)
+
+        X = self._read_matrix(meta["rows"])
+        return X, {"cached_rows": meta["rows"] - added, "new_rows": added, "rebuilt": False}
+
+    # ---------- internals ----------
+
+    def _new_rows(self, meta):
+        """Raw rows appended since the last run, and the new CSV byte offset
+        (always just past the last complete line consumed)."""
+        size = os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+        if _first_line(self.log_file) == meta["csv_first_line"] and size >= meta["csv_offset"]:
+            # Same file, only appended to: parse just the new complete lines
+            header, data, offset = _complete_lines(self.log_file, meta["csv_offset"])
+            if not data:
+                return pd.DataFrame(columns=RAW), meta["csv_offset"]
+            return _clean(_parse(header, data)), offset
+
+        # The CSV was compacted (archive.py) since the last run: pick up
+        # anything newer than what we consumed from the archive and CSV
+        last_ts = pd.Timestamp(meta["last_ts"])
+        parts = list(iter_segments(self.archive_dir, self.log_file, start=last_ts.normalize()))
+        header, data, offset = _complete_lines(self.log_file)
+        if data:
+            parts.append(_parse(header, data))
+        df = _clean(pd.concat(parts, ignore_index=True)) if parts else pd.DataFrame(columns=RAW)
+        return df[df["Timestamp"] > last_ts].reset_index(drop=True), offset
+
+    def _tail(self, raw):
+        # Everything a later row's window (and delta) can still reach
+        if raw.empty:
+            return []
+        last = raw["Timestamp"].iloc[-1]
+        in_window = np.flatnonzero(raw["Timestamp"] > last - pd.Timedelta(seconds=self.window_sec))
+        keep = raw.iloc[max(in_window[0] - 1, 0):]
+        return [[str(r.Timestamp), float(r.Temperature), float(r.Humidity), float(r.Motion)]
+                for r in keep.itertuples(index=False)]
+
+    def _append(self, rows, existing_rows):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.data_path, "ab") as f:
+            # Drop anything past the committed row count (crash between writes)
+            f.truncate(existing_rows * len(FEATURE_COLUMNS) * 8)
+            np.ascontiguousarray(rows, dtype=np.float64).tofile(f)
+        return len(rows)
+
+    def _read_matrix(self, rows):
+        return np.fromfile(self.data_path, dtype=np.float64,
+                           count=rows * len(FEATURE_COLUMNS)).reshape(rows, len(FEATURE_COLUMNS))
+
+    def _write_meta(self, meta):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _rebuild(self):
+        parts = list(iter_segments(self.archive_dir, self.log_file))
+        # Parse exactly the bytes we record as consumed
+        header, data, offset = _complete_lines(self.log_file)
+        if data:
+            parts.append(_parse(header, data))
+        raw = _clean(pd.concat(parts, ignore_index=True)) if parts else pd.DataFrame(columns=RAW)
+        feats = compute_features(raw, self.window_sec)[FEATURE_COLUMNS].to_numpy()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(self.data_path):
+            os.remove(self.data_path)
+        self._append(feats, 0)
+        meta = {
+            "key": self.key,
+            "history_start": _history_start(self.archive_dir, self.log_file),
+            "rows": len(feats),
+            "tail": self._tail(raw),
+            "last_ts": str(raw["Timestamp"].iloc[-1]) if len(raw) else None,
+            "csv_offset": offset,
+            "csv_first_line": _first_line(self.log_file),
+        }
+        self._write_meta(meta)
+        return feats, {"cached_rows": 0, "new_rows": len(feats), "rebuilt": True}
@@ -0,0 +1,200 @@
+# features.py
+# Shared feature pipeline for training, backfill and live detection.
+#
+# Two implementations that must produce the same output:
+#   compute_features()     - vectorized (pandas), for training and backfill
+#   IncrementalFeatures    - O(1) per sample, for the streaming detector
+import math
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Raw sensor columns as written by sensor_logger.py / realtime_detector.py
+RAW_COLUMNS = ["Temperature", "Humidity", "Motion"]
+
+# Model input, in order. Bump FEATURE_VERSION whenever this list or the
+# way a feature is computed changes, so stale models/caches are rejected.
+FEATURE_COLUMNS = [
+    "temp_mean", "hum_mean", "motion_rate",
+    "temp_std", "hum_std",
+    "temp_delta", "hum_delta",
+    "tod_sin", "tod_cos",
+]
+FEATURE_VERSION = 2
+
+# Windows are defined in seconds, not samples, so features mean the same
+# thing when the scheduler bursts or backs off. A window needs at least
+# MIN_PERIODS samples; deltas are per second, with gaps below MIN_DT_SEC
+# (timestamps have 1 s resolution) treated as MIN_DT_SEC.
+MIN_PERIODS = 2
+MIN_DT_SEC = 1.0
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def window_seconds(config):
+    """Feature window length: MODEL.rolling_window samples at the base interval."""
+    return config["MODEL"]["rolling_window"] * config["LOGGING"]["interval_sec"]
+
+
+def _time_of_day(seconds):
+    angle = 2 * np.pi * seconds / SECONDS_PER_DAY
+    return np.sin(angle), np.cos(angle)
+
+
+def compute_features(df, window_sec):
+    """Vectorized features for every row with MIN_PERIODS samples in its window."""
+    ts = pd.to_datetime(df["Timestamp"])
+    raw = df[RAW_COLUMNS].astype(float).set_axis(pd.DatetimeIndex(ts), axis=0)
+
+    # Time-based window (t - window_sec, t], same as IncrementalFeatures
+    roll = raw.rolling(pd.Timedelta(seconds=window_sec), min_periods=MIN_PERIODS)
+    means = roll.mean().to_numpy()
+    stds = roll.std().to_numpy()
+
+    dt = ts.diff().dt.total_seconds().clip(lower=MIN_DT_SEC).to_numpy()
+    deltas = raw.diff().to_numpy() / dt[:, None]
+
+    seconds = ts.dt.hour * 3600 + ts.dt.minute * 60 + ts.dt.second
+    tod_sin, tod_cos = _time_of_day(seconds.to_numpy(dtype=float))
+
+    out = pd.DataFrame({
+        "temp_mean": means[:, 0],
+        "hum_mean": means[:, 1],
+        "motion_rate": means[:, 2],
+        "temp_std": stds[:, 0],
+        "hum_std": stds[:, 1],
+        "temp_delta": deltas[:, 0],
+        "hum_delta": deltas[:, 1],
+        "tod_sin": tod_sin,
+        "tod_cos": tod_cos,
+    }, index=df.index)
+    return out.dropna()
+
+
+class _WindowStats:
+    # Time-windowed mean/variance (Welford update with removal)
+    def __init__(self):
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    def pop(self):
+        x = self.values.popleft()
+        n = len(self.values)
+        if n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        old_mean = self.mean
+        self.mean = (old_mean * (n + 1) - x) / n
+        self.m2 -= (x - old_mean) * (x - self.mean)
+        # Removal leaves rounding residue behind; a flat window must read
+        # as exactly 0 like pandas does. Real sensor variance is >> this.
+        if self.m2 < 1e-9:
+            self.m2 = 0.0
+
+    @property
+    def std(self):
+        n = len(self.values)
+        if n < 2:
+            return float("nan")
+        return math.sqrt(self.m2 / (n - 1))
+
+
+class IncrementalFeatures:
+    """Streaming counterpart of compute_features(), one sample at a time."""
+
+    def __init__(self, window_sec):
+        self.window_sec = window_sec
+        self.times = deque()
+        self.temp = _WindowStats()
+        self.hum = _WindowStats()
+        self.motion = _WindowStats()
+        self.prev = None
+
+    def update(self, timestamp, temperature, humidity, motion):
+        """Add one reading; returns a feature list, or None while warming up."""
+        if isinstance(timestamp, str):
+            timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        temperature, humidity, motion = float(temperature), float(humidity), float(motion)
+        t = timestamp.timestamp()
+
+        # Evict samples that fell out of (t - window_sec, t]
+        while self.times and self.times[0] <= t - self.window_sec:
+            self.times.popleft()
+            self.temp.pop()
+            self.hum.pop()
+            self.motion.pop()
+        self.times.append(t)
+        self.temp.push(temperature)
+        self.hum.push(humidity)
+        self.motion.push(motion)
+
+        prev, self.prev = self.prev, (t, temperature, humidity)
+        if len(self.times) < MIN_PERIODS or prev is None:
+            return None
+
+        dt = max(t - prev[0], MIN_DT_SEC)
+        seconds = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+        angle = 2 * math.pi * seconds / SECONDS_PER_DAY
+        return [
+            self.temp.mean, self.hum.mean, self.motion.mean,
+            self.temp.std, self.hum.std,
+            (temperature - prev[1]) / dt, (humidity - prev[2]) / dt,
+            math.sin(angle), math.cos(angle),
+        ]
+
+
+def check_model_features(model_data):
+    # Models trained before the shared pipeline only have model + scaler
+    if model_data.get("feature_version") != FEATURE_VERSION:
+        raise ValueError(
+            "Model was trained with a different feature set - "
+            "retrain it with train_model.py"
+        )
+
+
+# Per-tick benchmark (parity is covered by tests/test_features.py):
+#   python features.py [sensor_log.csv]
+if __name__ == "__main__":
+    import json
+    import sys
+
+    with open("config.json") as f:
+        CONFIG = json.load(f)
+    log_file = sys.argv[1] if len(sys.argv) > 1 else CONFIG["LOGGING"]["log_file"]
+    window = window_seconds(CONFIG)
+
+    df = pd.read_csv(log_file).dropna().reset_index(drop=True)
+
+    start = time.perf_counter()
+    batch = compute_features(df, window)
+    batch_sec = time.perf_counter() - start
+
+    inc = IncrementalFeatures(window)
+    records = df[["Timestamp"] + RAW_COLUMNS].itertuples(index=False, name=None)
+    start = time.perf_counter()
+    for ts, temp, hum, motion in records:
+        inc.update(ts, temp, hum, motion)
+    inc_sec = time.perf_counter() - start
+
+    print(f"Rows: {len(df)} raw, {len(batch)} feature rows")
+    print(f"Batch:       {batch_sec * 1e3:.1f} ms total")
+    print(f"Incremental: {inc_sec / len(df) * 1e6:.1f} us per tick")
+
+    # The old detector path: rebuild a DataFrame from the buffer every tick
+    buffer = df[RAW_COLUMNS].to_numpy()[:CONFIG["MODEL"]["rolling_window"]].tolist()
+    start = time.perf_counter()
+    for _ in range(1000):
+        pd.DataFrame(buffer, columns=RAW_COLUMNS).mean().to_frame().T
+    print(f"Old per-tick DataFrame mean: {(time.perf_counter() - start) * 1e3:.1f} us per tick")
@@ -4,6 +4,7 @@ import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+from live_export import LiveHtmlExporter, num
 
 # Load configuration
 with open("config.json") as f:
@@ -12,6 +13,7 @@ with open("config.json") as f:
 data_file = config["LOGGING"]["log_file"]
 refresh_interval = config["LOGGING"]["interval_sec"]
 output_html = "improved_live_plot.html"
+export_mode = config.get("PLOTTING", {}).get("export_mode", "incremental")
 
 # Load the sensor data CSV
 def load_data():
@@ -27,7 +29,7 @@ def load_data():
         return pd.DataFrame()
 
 # Create 3-panel subplot chart
-def plot_graph(df):
+def build_figure(df):
     fig = make_subplots(
         rows=3, cols=1,
         shared_xaxes=True,
@@ -71,16 +73,46 @@ def plot_graph(df):
         xaxis_title="Time",
         showlegend=False
     )
+    return fig
+
+# Points appended since the last export, per trace (same order as build_figure)
+def new_points(rows):
+    ts = [r['Timestamp'] for r in rows]
+    return [
+        (ts, [num(r['Temperature']) for r in rows]),
+        (ts, [num(r['Humidity']) for r in rows]),
+        (ts, [num(r['Motion']) for r in rows]),
+    ]
 
+def plot_graph(df):
     # Save to HTML
-    fig.write_html(output_html)
+    build_figure(df).write_html(output_html)
     print(f"✅ Chart saved as {output_html}")
 
 # Main loop
 print("📊 Improved Live Plotting Started. Press CTRL+C to stop...\n")
 
+exporter = LiveHtmlExporter(data_file, output_html, build_figure, new_points, poll_sec=refresh_interval,
+                            archive_dir=config["LOGGING"]["archive_dir"],
+                            history_hours=config.get("PLOTTING", {}).get("history_hours", 24))
+
 try:
     while True:
+        if export_mode == "incremental":
+            # Skips all work when the CSV is unchanged; otherwise writes only new points
+            if os.path.exists(data_file):
+                try:
+                    result = exporter.refresh()
+                except Exception as e:
+                    print(f"[ERROR] Could not update chart: {e}")
+                    result = None
+                if result == "page":
+                    print(f"✅ Chart saved as {output_html} (plotly.min.js alongside)")
+                elif result == "data":
+                    print(f"✅ New points written to {exporter.data_path}")
+            time.sleep(refresh_interval)
+            continue
+
         df = load_data()
         if not df.empty:
             plot_graph(df)
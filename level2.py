@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # level2_monitor_email.py
 # logs data and sends email when soil gets dry
-import time
 import csv
 import os
 import sys
@@ -9,11 +8,20 @@ import smtplib
 import getpass
 from datetime import datetime
 from email.mime.text import MIMEText
-import RPi.GPIO as GPIO
+from sim_sensors import load_gpio
+from soil_sensor import SoilSensor
+
+# RPi.GPIO on the Pi, mock_gpio with MOCK_GPIO=1
+GPIO = load_gpio()
 
 SENSOR = 17
 LOG_FILE = "soil_data.csv"
 
+# edge-triggered sensing: debounce for the pin, and a heartbeat row so the
+# log shows the sensor is alive even when nothing changes
+DEBOUNCE_MS = 200
+HEARTBEAT = 300       # seconds
+
 # global email variables
 EMAIL_FROM = ""
 EMAIL_PASS = ""
@@ -108,6 +116,7 @@ def main():
         get_email_credentials()
     
     setup()
+    sensor = SoilSensor(GPIO, SENSOR, DEBOUNCE_MS, HEARTBEAT)
     
     print("\n" + "=" * 60)
     print("  LEVEL 2: MONITORING + EMAIL ALERTS")
@@ -117,26 +126,22 @@ def main():
     print("=" * 60)
     print("\n  🌱 Monitoring soil moisture...\n")
     
-    last_print = 0
+    # only state changes and heartbeats are logged
+    state, val = sensor.start()
+    event = "change"
     
     try:
         while True:
-            state, val = read()
             t = datetime.now()
             
             # save to csv
             log_data(t, state, val)
             
-            # print status every 30 seconds
-            now = time.time()
-            if now - last_print >= 30:
-                time_str = t.strftime('%H:%M:%S')
-                if state == "DRY":
-                    print(f"  [{time_str}] SOIL DRY")
-                else:
-                    print(f"  [{time_str}] Soil wet")
-                
-                last_print = now
+            time_str = t.strftime('%H:%M:%S')
+            if state == "DRY":
+                print(f"  [{time_str}] SOIL DRY" + (" (heartbeat)" if event == "heartbeat" else ""))
+            else:
+                print(f"  [{time_str}] Soil wet" + (" (heartbeat)" if event == "heartbeat" else ""))
             
             # send email when soil becomes dry
             if state == "DRY" and not email_sent:
@@ -149,7 +154,9 @@ def main():
             if state == "WET":
                 email_sent = False
             
-            time.sleep(1)
+            # sleep until the pin changes or the next heartbeat
+            event = sensor.wait()
+            state, val = sensor.state, sensor.value
             
     except KeyboardInterrupt:
         print("\n\n  ✓ Monitoring stopped\n")
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # level3_auto_pump.py
 # full automation with relay control, pump, and web dashboard
-import time
 import csv
 import os
 import sys
@@ -9,9 +8,18 @@ import smtplib
 import getpass
 from datetime import datetime
 from email.mime.text import MIMEText
-import RPi.GPIO as GPIO
-from flask import Flask, render_template_string, jsonify
+from sim_sensors import load_gpio
+from soil_sensor import SoilSensor, SystemClock
+from flask import Flask, render_template_string, jsonify, request
 import threading
+from metrics import setup_metrics
+from watering_history import LogIndex, row_dict
+
+# RPi.GPIO on the Pi, mock_gpio with MOCK_GPIO=1
+GPIO = load_gpio()
+
+# all timing goes through this, so level3_sim.py can swap in a VirtualClock
+clock = SystemClock()
 
 # pins
 SENSOR = 17
@@ -20,7 +28,12 @@ RELAY = 23
 # settings - adjust for your plant
 PUMP_TIME = 30        # seconds to run pump
 COOLDOWN = 600        # seconds between waterings (10 min)
-DRY_COUNT = 3         # dry readings needed
+DRY_COUNT = 3         # seconds soil must stay dry before watering
+
+# edge-triggered sensing: pin debounce, and a heartbeat row so the log
+# shows the sensor is alive even when nothing changes
+DEBOUNCE_MS = 200
+HEARTBEAT = 300       # seconds
 
 # email
 EMAIL_FROM = ""
@@ -29,16 +42,22 @@ EMAIL_TO = ""
 
 LOG_FILE = "watering_log.csv"
 
+# prometheus metrics on localhost (0 = off)
+METRICS_PORT = 9103
+
 # tracking
 email_sent = False
 last_water = None
-dry_counter = 0
+dry_since = None      # monotonic time the soil last turned dry
 current_state = "UNKNOWN"
 pump_running = False
 
 # flask app for dashboard
 app = Flask(__name__)
 
+# sparse offset index over LOG_FILE for /history (watering_history.py)
+history_index = None
+
 def setup():
     GPIO.setmode(GPIO.BCM)
     GPIO.setup(SENSOR, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
@@ -55,14 +74,17 @@ def read():
 def ready_to_water():
     if last_water is None:
         return True
-    elapsed = (datetime.now() - last_water).total_seconds()
+    elapsed = (clock.now() - last_water).total_seconds()
     return elapsed >= COOLDOWN
 
-def time_remaining():
+def cooldown_left():
     if last_water is None:
-        return 0, 0
-    elapsed = (datetime.now() - last_water).total_seconds()
-    remaining = max(0, COOLDOWN - elapsed)
+        return 0
+    elapsed = (clock.now() - last_water).total_seconds()
+    return max(0, COOLDOWN - elapsed)
+
+def time_remaining():
+    remaining = cooldown_left()
     mins = int(remaining // 60)
     secs = int(remaining % 60)
     return mins, secs
@@ -80,10 +102,10 @@ def run_pump():
         print(f"\n  💧 PUMPING for {secs} seconds")
     
     GPIO.output(RELAY, GPIO.HIGH)
-    time.sleep(PUMP_TIME)
+    clock.sleep(PUMP_TIME)
     GPIO.output(RELAY, GPIO.LOW)
     
-    last_water = datetime.now()
+    last_water = clock.now()
     pump_running = False
     cooldown_min = COOLDOWN // 60
     print(f"  ✓ Done! Next watering in {cooldown_min} minutes\n")
@@ -234,6 +256,15 @@ DASHBOARD_HTML = """
         button:active {
             transform: scale(0.98);
         }
+        .history {
+            margin-top: 20px;
+            font-size: 14px;
+            color: #555;
+        }
+        .history div {
+            padding: 4px 0;
+            border-bottom: 1px solid #eee;
+        }
     </style>
 </head>
 <body>
@@ -254,6 +285,11 @@ DASHBOARD_HTML = """
         </div>
         
         <button onclick="waterNow()">💧 Manual Water</button>
+        
+        <div class="history">
+            <div class="info-label">RECENT ACTIVITY</div>
+            <div id="history"></div>
+        </div>
     </div>
     
     <script>
@@ -285,8 +321,20 @@ DASHBOARD_HTML = """
                 .then(data => alert(data.message));
         }
         
+        function updateHistory() {
+            fetch('/history?limit=10&points=0')
+                .then(r => r.json())
+                .then(data => {
+                    document.getElementById('history').innerHTML = data.rows.map(row =>
+                        `<div>${row.timestamp.replace('T', ' ').slice(0, 19)} - ${row.state} ${row.action}</div>`
+                    ).join('');
+                });
+        }
+        
         updateStatus();
+        updateHistory();
         setInterval(updateStatus, 2000);
+        setInterval(updateHistory, 30000);
     </script>
 </body>
 </html>
@@ -327,11 +375,111 @@ def manual_water():
     threading.Thread(target=run_pump).start()
     return jsonify({'message': 'Watering started!'})
 
+def get_history_index():
+    global history_index
+    if history_index is None or history_index.log_path != LOG_FILE:
+        history_index = LogIndex(LOG_FILE)
+    return history_index
+
+@app.route('/history')
+def history():
+    """Newest-first log rows in [start, end] (ISO times), `limit` per page,
+    plus a `points`-long moisture/pump series for a chart."""
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        points = min(max(int(request.args.get('points', 200)), 0), 2000)
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            cursor = int(cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not os.path.exists(LOG_FILE):
+        return jsonify({'rows': [], 'next_cursor': None, 'series': []})
+    
+    index = get_history_index()
+    rows, next_cursor = index.page(start, end, limit, cursor)
+    # the chart only changes with the range, so skip it on follow-up pages
+    series = index.series(start, end, points) if cursor is None else []
+    return jsonify({
+        'rows': [row_dict(r) for r in rows],
+        'next_cursor': next_cursor,
+        'series': series
+    })
+
 def run_dashboard():
     app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
 
+def control_loop(until=None):
+    """Sensor/pump loop; runs until clock.monotonic() reaches `until` (forever if None)."""
+    global email_sent, dry_since, current_state
+    
+    metrics = setup_metrics("level3", {"enabled": METRICS_PORT > 0, "ports": {"level3": METRICS_PORT}})
+    
+    # sleep on the sensor pin instead of polling it every second
+    sensor = SoilSensor(GPIO, SENSOR, DEBOUNCE_MS, HEARTBEAT, clock)
+    state, val = sensor.start()
+    event = "change"
+    dry_since = clock.monotonic() if state == "DRY" else None
+    
+    while until is None or clock.monotonic() < until:
+        metrics.inc("ticks")
+        current_state = state
+        t = clock.now()
+        action = ""
+        
+        # only state changes, heartbeats and waterings are logged
+        log_row = event != "timeout"
+        if log_row:
+            mins, secs = time_remaining()
+            
+            if mins > 0 or secs > 0:
+                print(f"  [{t.strftime('%H:%M')}] {state} - Cooldown: {mins}m {secs}s")
+            else:
+                print(f"  [{t.strftime('%H:%M')}] {state} - Ready")
+        
+        # auto watering logic
+        dry_for = clock.monotonic() - dry_since if dry_since is not None else 0
+        if state == "DRY" and dry_for >= DRY_COUNT and ready_to_water():
+            action = "WATERED"
+            log_row = True
+            metrics.inc("waterings")
+            with metrics.span("pump"):
+                run_pump()
+            
+            if not email_sent:
+                with metrics.span("email"):
+                    send_email()
+                metrics.inc("emails")
+                email_sent = True
+            
+            dry_since = clock.monotonic()
+        
+        # reset email flag
+        if state == "WET":
+            email_sent = False
+        
+        if log_row:
+            with metrics.span("csv_append"):
+                log_data(t, state, val, action)
+        
+        # sleep until the pin changes, a heartbeat, or watering could be due
+        timeout = None
+        if state == "DRY":
+            due = dry_since + DRY_COUNT - clock.monotonic()
+            timeout = max(0, due, cooldown_left())
+        event = sensor.wait(timeout)
+        state, val = sensor.state, sensor.value
+        if event == "change":
+            dry_since = clock.monotonic() if state == "DRY" else None
+    
+    return metrics
+
 def main():
-    global email_sent, dry_counter, current_state
     global EMAIL_FROM, EMAIL_PASS, EMAIL_TO
     
     # Check if email credentials are in environment variables
@@ -360,52 +508,8 @@ def main():
     dashboard_thread.daemon = True
     dashboard_thread.start()
     
-    last_print = 0
-    
     try:
-        while True:
-            state, val = read()
-            current_state = state
-            t = datetime.now()
-            action = ""
-            
-            # count dry readings
-            if state == "DRY":
-                dry_counter += 1
-            else:
-                dry_counter = 0
-            
-            # print status every 30 sec
-            now = time.time()
-            if now - last_print >= 30:
-                mins, secs = time_remaining()
-                
-                if mins > 0 or secs > 0:
-                    print(f"  [{t.strftime('%H:%M')}] {state} - Cooldown: {mins}m {secs}s")
-                else:
-                    print(f"  [{t.strftime('%H:%M')}] {state} - Ready")
-                
-                last_print = now
-            
-            # auto watering logic
-            if dry_counter >= DRY_COUNT and ready_to_water():
-                action = "WATERED"
-                run_pump()
-                
-                if not email_sent:
-                    send_email()
-                    email_sent = True
-                
-                dry_counter = 0
-                last_print = 0
-            
-            # reset email flag
-            if state == "WET":
-                email_sent = False
-            
-            log_data(t, state, val, action)
-            time.sleep(1)
-            
+        control_loop()
     except KeyboardInterrupt:
         print("\n\n  ✓ System stopped\n")
     finally:
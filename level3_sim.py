@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# level3_sim.py
+# runs the level3 watering controller against simulated soil on a virtual
+# clock: days of PUMP_TIME / COOLDOWN / DRY_COUNT behaviour in seconds.
+#
+#   MOCK_GPIO=1 python level3_sim.py --days 7 --scenario normal
+#   MOCK_GPIO=1 python level3_sim.py --trace my_soil.csv   (time_sec,state rows)
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("MOCK_GPIO", "1")
+
+import mock_gpio
+import level3
+from soil_sensor import VirtualClock
+
+# scenario: hours for wet soil to dry out, moisture added per pump second,
+# and how much the digital output chatters near the threshold
+SCENARIOS = {
+    "normal": {"dry_hours": 12, "pump_gain": 0.05, "flicker": 0.0},
+    "hot": {"dry_hours": 3, "pump_gain": 0.05, "flicker": 0.0},
+    "noisy": {"dry_hours": 12, "pump_gain": 0.05, "flicker": 0.3},
+    "weak_pump": {"dry_hours": 8, "pump_gain": 0.005, "flicker": 0.0},
+    "stuck_dry": {"dry_hours": 0, "pump_gain": 0.0, "flicker": 0.0},
+}
+
+STEP = 10          # seconds between soil model updates
+THRESHOLD = 0.3    # moisture below this reads DRY
+GLITCH_SEC = (0.05, 2.0)   # flicker pulse length: some under the debounce, some over
+
+
+class SoilModel:
+    """Moisture in [0, 1]: dries over time (faster by day), rises while the relay is on."""
+
+    def __init__(self, clock, dry_hours, pump_gain, flicker, seed=1):
+        self.clock = clock
+        self.dry_rate = 1.0 / (dry_hours * 3600) if dry_hours else 0.0
+        self.pump_gain = pump_gain
+        self.flicker = flicker
+        self.rng = random.Random(seed)
+        self.moisture = 0.0 if dry_hours == 0 else 1.0
+        self.last = 0.0
+        self.glitches = 0
+
+    def start(self):
+        self._emit()
+        self.clock.call_at(STEP, self.step)
+
+    def step(self):
+        now = self.clock.monotonic()
+        dt, self.last = now - self.last, now
+        hour = self.clock.now().hour
+        day_factor = 1.5 if 9 <= hour < 18 else 0.6
+        self.moisture -= self.dry_rate * day_factor * dt
+        if mock_gpio.input(level3.RELAY):
+            self.moisture += self.pump_gain * dt
+        self.moisture = min(1.0, max(0.0, self.moisture))
+        self._emit()
+        self.clock.call_at(now + STEP, self.step)
+
+    def _emit(self):
+        dry = self.moisture < THRESHOLD
+        mock_gpio.set_input(level3.SENSOR, 1 if dry else 0)
+        if self.flicker and abs(self.moisture - THRESHOLD) < 0.05 and self.rng.random() < self.flicker:
+            # Chatter near the threshold: the other level for a moment, then back
+            self.glitches += 1
+            mock_gpio.set_input(level3.SENSOR, 0 if dry else 1)
+            self.clock.call_at(self.clock.monotonic() + self.rng.uniform(*GLITCH_SEC), self._settle)
+
+    def _settle(self):
+        mock_gpio.set_input(level3.SENSOR, 1 if self.moisture < THRESHOLD else 0)
+
+
+class ScriptedSoil:
+    """Replays a (time_sec, DRY|WET) trace."""
+
+    def __init__(self, clock, path):
+        self.clock = clock
+        with open(path, newline="") as f:
+            self.points = [(float(r["time_sec"]), r["state"].strip().upper()) for r in csv.DictReader(f)]
+
+    def start(self):
+        mock_gpio.set_input(level3.SENSOR, 0)
+        for when, state in self.points:
+            value = 1 if state == "DRY" else 0
+            self.clock.call_at(when, lambda v=value: mock_gpio.set_input(level3.SENSOR, v))
+
+
+def pump_runs(history):
+    """[(start, end)] relay-on intervals from mock_gpio's output history."""
+    runs, started = [], None
+    for when, pin, value in history:
+        if pin != level3.RELAY:
+            continue
+        if value and started is None:
+            started = when
+        elif not value and started is not None:
+            runs.append((started, when))
+            started = None
+    return runs
+
+
+def simulate(days, soil_factory, verbose=False):
+    clock = VirtualClock()
+    mock_gpio.reset()
+    mock_gpio.clock = clock.monotonic
+
+    emails = []
+    level3.clock = clock
+    level3.METRICS_PORT = 0
+    level3.last_water = None
+    level3.email_sent = False
+    level3.send_email = lambda: emails.append(clock.now()) or True
+    level3.LOG_FILE = os.path.join(tempfile.mkdtemp(), "watering_log.csv")
+
+    level3.setup()
+    soil = soil_factory(clock)
+    soil.start()
+
+    duration = days * 24 * 3600
+    out = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        metrics = level3.control_loop(until=duration)
+    wall = time.perf_counter() - start
+
+    runs = pump_runs(mock_gpio.history)
+    pump_sec = sum(end - begin for begin, end in runs)
+    violations = sum(1 for (_, prev_end), (begin, _) in zip(runs, runs[1:])
+                     if begin - prev_end < level3.COOLDOWN - 1e-6)
+    with open(level3.LOG_FILE) as f:
+        log_rows = sum(1 for _ in f) - 1
+
+    return {
+        "sim_days": days,
+        "waterings": len(runs),
+        "pump_duty_pct": 100.0 * pump_sec / duration,
+        "cooldown_violations": violations,
+        "email_alerts": len(emails),
+        "log_rows": log_rows,
+        "loop_iterations": metrics.counters.get("ticks", 0),
+        "sensor_glitches": getattr(soil, "glitches", 0),
+        "wall_sec": wall,
+        "speedup": duration / wall if wall else float("inf"),
+        "iterations_per_sec": metrics.counters.get("ticks", 0) / wall if wall else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the level3 watering controller")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="normal")
+    parser.add_argument("--trace", help="CSV with time_sec,state rows instead of a scenario")
+    parser.add_argument("--verbose", action="store_true", help="show the controller's own output")
+    args = parser.parse_args()
+
+    if args.trace:
+        factory = lambda clock: ScriptedSoil(clock, args.trace)
+        name = args.trace
+    else:
+        factory = lambda clock: SoilModel(clock, **SCENARIOS[args.scenario])
+        name = args.scenario
+
+    r = simulate(args.days, factory, args.verbose)
+    print("\n" + "=" * 60)
+    print(f"  LEVEL 3 SIMULATION: {name}, {r['sim_days']:g} days")
+    print("=" * 60)
+    print(f"  💧 Waterings:           {r['waterings']}")
+    print(f"  ⏱️  Pump duty cycle:     {r['pump_duty_pct']:.3f}%")
+    print(f"  ⚠️  Cooldown violations: {r['cooldown_violations']}")
+    print(f"  📧 Email alerts:        {r['email_alerts']}")
+    print(f"  📄 Log rows:            {r['log_rows']}")
+    if r["sensor_glitches"]:
+        print(f"  ⚡ Sensor glitches:     {r['sensor_glitches']}")
+    print(f"  🔁 Loop iterations:     {r['loop_iterations']}")
+    print(f"  🚀 {r['wall_sec']:.2f}s wall, {r['speedup']:,.0f}x real time, "
+          f"{r['iterations_per_sec']:,.0f} iterations/s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# live_export.py
+# Change-aware, incremental HTML export for the live plotters.
+#
+# The page is written once (with plotly.min.js as a separate static file
+# next to it, written only if missing). After that each refresh only
+# rewrites a small <name>_data.js payload holding the last few chunks of
+# new points; the page loads it with a <script> tag (works from file://
+# too) and applies them with Plotly.extendTraces. Nothing is written when
+# the CSV hasn't changed. The page records the last chunk it already
+# contains; once that chunk's successor has been dropped from the payload,
+# the page is rewritten so a newly opened one never starts with a gap.
+# With an archive_dir, every page also starts with the last history_hours
+# of archived rows, so compaction doesn't empty the chart at midnight.
+import csv
+import io
+import json
+import os
+import time
+from collections import deque
+
+import pandas as pd
+
+from archive import read_recent
+
+
+def num(value):
+    """CSV cell -> float, or None for blanks (plotted as a gap)."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if value != value else value  # archived blanks decode as NaN
+
+
+class CsvTail:
+    """Tracks a CSV by (inode, size, mtime) and reads only appended rows."""
+
+    def __init__(self, path):
+        self.path = path
+        self.inode = None
+        self.offset = 0
+        self.mtime = None
+        self.header = None
+
+    def changed(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_ino, st.st_size, st.st_mtime) != (self.inode, self.offset, self.mtime)
+
+    def read_new(self):
+        """Returns (rows, reset). reset=True means the file was replaced or
+        truncated (e.g. by archive.py compaction) and callers should rebuild."""
+        st = os.stat(self.path)
+        reset = st.st_ino != self.inode or st.st_size < self.offset
+        if reset:
+            self.inode, self.offset, self.header = st.st_ino, 0, None
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        # Only consume complete lines; a half-written row is picked up next time
+        end = data.rfind(b"\n") + 1
+        data = data[:end]
+        self.offset += end
+        self.mtime = st.st_mtime if self.offset == st.st_size else None
+
+        lines = data.decode().splitlines()
+        if self.header is None and lines:
+            self.header = next(csv.reader([lines[0]]))
+            lines = lines[1:]
+        rows = [dict(zip(self.header, r)) for r in csv.reader(lines)] if lines else []
+        return rows, reset
+
+
+class LiveHtmlExporter:
+    """Writes the full page once, then only small extendTraces payloads.
+
+    build_figure(df) -> plotly Figure from the whole CSV
+    new_points(rows) -> [(xs, ys), ...] for each trace, from appended CSV rows
+    """
+
+    def __init__(self, csv_path, html_path, build_figure, new_points,
+                 poll_sec=2, max_chunks=60, archive_dir=None, history_hours=0):
+        self.csv_path = csv_path
+        self.html_path = html_path
+        self.build_figure = build_figure
+        self.new_points = new_points
+        self.poll_sec = poll_sec
+        self.tail = CsvTail(csv_path)
+        self.chunks = deque(maxlen=max_chunks)
+        self.seq = 0
+        self.page_seq = 0     # last chunk already included in the page
+        self.generation = None
+        self.archive_dir = archive_dir
+        self.history_hours = history_hours
+        self.history = None   # archived rows shown before the CSV's, per generation
+
+        base, _ = os.path.splitext(html_path)
+        self.data_path = base + "_data.js"
+
+    def refresh(self):
+        """Returns 'unchanged', 'page' (full rewrite) or 'data' (payload only)."""
+        if not self.tail.changed():
+            return "unchanged"
+        try:
+            rows, reset = self.tail.read_new()
+            if reset or self.generation is None:
+                self._write_page(new_generation=True)
+                return "page"
+            if not rows:
+                return "unchanged"
+
+            traces = self.new_points(rows)
+            self.seq += 1
+            self.chunks.append({
+                "seq": self.seq,
+                "traces": list(range(len(traces))),
+                "x": [xs for xs, _ in traces],
+                "y": [ys for _, ys in traces],
+            })
+            if self.chunks[0]["seq"] > self.page_seq + 1:
+                # The payload no longer reaches back to the page: catch it up
+                self._write_page()
+                return "page"
+            self._write_payload()
+            return "data"
+        except Exception:
+            # Start over from the file on the next call
+            self.tail = CsvTail(self.csv_path)
+            self.generation = None
+            raise
+
+    def _write_page(self, new_generation=False):
+        df = pd.read_csv(io.BytesIO(self._read_consumed()))
+        if new_generation:
+            # Open pages built from other data must reload
+            self.generation = f"{time.time():.3f}"
+            self.seq = 0
+            self.chunks.clear()
+            self.history = self._read_history()
+        if self.history is not None and not self.history.empty:
+            df = pd.concat([self.history, df], ignore_index=True)
+        fig = self.build_figure(df)
+        self.page_seq = self.seq
+        self._write_payload()
+        fig.write_html(
+            self.html_path,
+            include_plotlyjs="directory",  # plotly.min.js written once, reused
+            post_script=self._poll_script(),
+        )
+
+    def _read_history(self):
+        if self.archive_dir is None:
+            return None
+        history = read_recent(self.archive_dir, self.csv_path, self.history_hours)
+        if not history.empty:
+            # Same form as the CSV's own cells
+            history["Timestamp"] = history["Timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+        return history
+
+    def _read_consumed(self):
+        # The page must match exactly what the tail has consumed so far
+        with open(self.csv_path, "rb") as f:
+            return f.read(self.tail.offset)
+
+    def _write_payload(self):
+        payload = {"generation": self.generation, "chunks": list(self.chunks)}
+        tmp = self.data_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("window.livePlotUpdate(" + json.dumps(payload, separators=(",", ":")) + ");")
+        os.replace(tmp, self.data_path)
+
+    def _poll_script(self):
+        src = os.path.basename(self.data_path)
+        return """
+var gd = document.getElementById('{plot_id}');
+var generation = %s, lastSeq = %d;
+window.livePlotUpdate = function (p) {
+    if (p.generation !== generation) { location.reload(); return; }
+    var fresh = p.chunks.filter(function (c) { return c.seq > lastSeq; });
+    if (fresh.length && fresh[0].seq !== lastSeq + 1) { location.reload(); return; }
+    fresh.forEach(function (c) {
+        Plotly.extendTraces(gd, {x: c.x, y: c.y}, c.traces);
+        lastSeq = c.seq;
+    });
+};
+setInterval(function () {
+    var s = document.createElement('script');
+    s.src = %s + '?t=' + Date.now();
+    s.onload = s.onerror = function () { s.remove(); };
+    document.head.appendChild(s);
+}, %d);
+""" % (json.dumps(self.generation), self.page_seq, json.dumps(src), int(self.poll_sec * 1000))
@@ -0,0 +1,28 @@
+# log_lock.py
+# Advisory lock between the CSV loggers and archive.compact().
+#
+# compact() replaces the live log with a new file. A row appended to the
+# old file between compact()'s last tail copy and the replace would be
+# lost, so both sides take an flock on a sidecar "<log>.lock" (the log
+# itself is swapped out, its lock would go with it). No-op where fcntl
+# isn't available.
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not on Linux / the Pi
+    fcntl = None
+
+
+@contextmanager
+def log_lock(log_file):
+    """Hold the lock for `log_file` while appending to or replacing it."""
+    if fcntl is None:
+        yield
+        return
+    with open(log_file + ".lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
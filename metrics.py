@@ -0,0 +1,187 @@
+# metrics.py
+# Per-stage timing spans, rolling latency histograms and counters for the
+# long-running loops, exposed in Prometheus text format over local HTTP and
+# optionally dumped to a file.
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prometheus histogram bucket bounds (seconds)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class _Histogram:
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)   # rolling window for quantiles
+        self.buckets = [0] * len(BUCKETS)    # cumulative since start
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.recent.append(seconds)
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+class Metrics:
+    """Counters and per-stage latency histograms for one loop."""
+
+    def __init__(self, loop, window=1024):
+        self.loop = loop
+        self.window = window
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = _Histogram(self.window)
+            hist.observe(seconds)
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as one sample of `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "loop": self.loop,
+                "uptime_sec": round(time.time() - self.started, 1),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {
+                    stage: {
+                        "count": hist.count,
+                        "sum_sec": hist.total,
+                        **{f"p{int(q * 100)}_sec": v for q, v in hist.quantiles().items()},
+                    }
+                    for stage, hist in self.histograms.items()
+                },
+            }
+
+    def render_prometheus(self):
+        loop = self.loop
+        lines = [
+            "# TYPE hsu_uptime_seconds gauge",
+            f'hsu_uptime_seconds{{loop="{loop}"}} {time.time() - self.started:.1f}',
+        ]
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE hsu_{name}_total counter")
+                lines.append(f'hsu_{name}_total{{loop="{loop}"}} {value}')
+
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE hsu_{name} gauge")
+                lines.append(f'hsu_{name}{{loop="{loop}"}} {value}')
+
+            lines.append("# TYPE hsu_stage_latency_seconds histogram")
+            for stage, hist in sorted(self.histograms.items()):
+                labels = f'loop="{loop}",stage="{stage}"'
+                for bound, n in zip(BUCKETS, hist.buckets):
+                    lines.append(f'hsu_stage_latency_seconds_bucket{{{labels},le="{bound}"}} {n}')
+                lines.append(f'hsu_stage_latency_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f"hsu_stage_latency_seconds_sum{{{labels}}} {hist.total:.6f}")
+                lines.append(f"hsu_stage_latency_seconds_count{{{labels}}} {hist.count}")
+
+            lines.append("# TYPE hsu_stage_latency_recent_seconds gauge")
+            for stage, hist in sorted(self.histograms.items()):
+                for q, v in hist.quantiles().items():
+                    lines.append(
+                        f'hsu_stage_latency_recent_seconds{{loop="{loop}",stage="{stage}",quantile="{q}"}} {v:.6f}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(metrics, port, host="127.0.0.1"):
+    """Serve /metrics in a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # keep the loop's console output readable
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_dump_thread(metrics, path, interval):
+    """Rewrite `path` with a JSON snapshot every `interval` seconds."""
+
+    def dump():
+        while True:
+            time.sleep(interval)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(metrics.snapshot(), f, indent=2)
+            os.replace(tmp, path)
+
+    threading.Thread(target=dump, daemon=True).start()
+
+
+def setup_metrics(loop, settings=None):
+    """Create a Metrics for `loop` and start whatever `settings` enables.
+
+    `settings` is the METRICS section of config.json (or an equivalent
+    dict): {"enabled", "host", "ports": {loop: port}, "dump_dir", "dump_interval_sec"}.
+    """
+    metrics = Metrics(loop)
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return metrics
+
+    port = settings.get("ports", {}).get(loop)
+    if port:
+        try:
+            start_http_server(metrics, port, settings.get("host", "127.0.0.1"))
+            print(f"📈 Metrics on http://{settings.get('host', '127.0.0.1')}:{port}/metrics")
+        except OSError as e:
+            print(f"[WARN] Metrics endpoint disabled: {e}")
+
+    dump_dir = settings.get("dump_dir")
+    if dump_dir:
+        os.makedirs(dump_dir, exist_ok=True)
+        start_dump_thread(metrics, os.path.join(dump_dir, f"{loop}_metrics.json"),
+                          settings.get("dump_interval_sec", 60))
+    return metrics
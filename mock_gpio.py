@@ -0,0 +1,131 @@
+# mock_gpio.py
+# Off-device stand-in for RPi.GPIO, drop-in as `import mock_gpio as GPIO`.
+#
+# Inputs are driven with set_input(pin, value), which fires edge callbacks
+# registered with add_event_detect() (honouring edge and bouncetime).
+# Unlike RPi.GPIO, callbacks run synchronously in the caller's thread.
+# Every output() is recorded in `history` as (time, pin, value).
+import time
+
+BCM = 11
+BOARD = 10
+IN = 1
+OUT = 0
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+# Replaceable time source for bouncetime and history
+clock = time.monotonic
+
+_mode = None
+_levels = {}
+_directions = {}
+_detect = {}   # pin -> {"edge", "callbacks", "bouncetime", "last", "pending"}
+history = []
+
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+
+def getmode():
+    return _mode
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(pin, direction, pull_up_down=PUD_OFF, initial=None):
+    pins = pin if isinstance(pin, (list, tuple)) else [pin]
+    for p in pins:
+        _directions[p] = direction
+        if direction == OUT:
+            _levels[p] = LOW if initial is None else initial
+        elif p not in _levels:
+            _levels[p] = HIGH if pull_up_down == PUD_UP else LOW
+
+
+def input(pin):
+    return _levels.get(pin, LOW)
+
+
+def output(pin, value):
+    pins = pin if isinstance(pin, (list, tuple)) else [pin]
+    for p in pins:
+        if _directions.get(p) != OUT:
+            raise RuntimeError(f"The GPIO channel {p} has not been set up as an OUTPUT")
+        _levels[p] = HIGH if value else LOW
+        history.append((clock(), p, _levels[p]))
+
+
+def add_event_detect(pin, edge, callback=None, bouncetime=None):
+    if pin in _detect:
+        raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+    _detect[pin] = {
+        "edge": edge, "callbacks": [callback] if callback else [],
+        "bouncetime": (bouncetime or 0) / 1000.0, "last": None, "pending": False,
+    }
+
+
+def add_event_callback(pin, callback):
+    _detect[pin]["callbacks"].append(callback)
+
+
+def remove_event_detect(pin):
+    _detect.pop(pin, None)
+
+
+def event_detected(pin):
+    d = _detect.get(pin)
+    if d is None or not d["pending"]:
+        return False
+    d["pending"] = False
+    return True
+
+
+def cleanup(pin=None):
+    pins = [pin] if pin is not None else list(_levels)
+    for p in pins:
+        _levels.pop(p, None)
+        _directions.pop(p, None)
+        _detect.pop(p, None)
+
+
+# ---------- test helpers ----------
+
+def set_input(pin, value):
+    """Drive an input pin; fires matching edge callbacks."""
+    old = _levels.get(pin, LOW)
+    new = HIGH if value else LOW
+    _levels[pin] = new
+    d = _detect.get(pin)
+    if d is None or old == new:
+        return
+    rising = new == HIGH
+    if d["edge"] == RISING and not rising or d["edge"] == FALLING and rising:
+        return
+    now = clock()
+    if d["last"] is not None and now - d["last"] < d["bouncetime"]:
+        return
+    d["last"] = now
+    d["pending"] = True
+    for cb in list(d["callbacks"]):
+        cb(pin)
+
+
+def reset():
+    """Forget all pin state and recorded history."""
+    global _mode
+    _mode = None
+    _levels.clear()
+    _directions.clear()
+    _detect.clear()
+    history.clear()
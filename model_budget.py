@@ -0,0 +1,101 @@
+# model_budget.py
+# Picks the smallest IsolationForest that fits a latency / memory budget.
+#
+# The detector scores one feature row per tick, so what matters on a Pi
+# Zero-class board is the cost of a single scaler.transform() +
+# decision_function() call and the size of the pickle it has to load.
+# We train a grid of smaller forests on the same scaled matrix, time them
+# here, and keep the cheapest one whose anomaly decisions still agree with
+# the full model.
+import io
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+N_ESTIMATORS = [10, 20, 30, 50, 75, 100]
+MAX_SAMPLES = [32, 64, 128, 256]
+
+
+def score_latency_ms(model, scaler, X, calls=100):
+    """Median wall time of one per-tick scoring call, like realtime_detector.py."""
+    rows = X[np.linspace(0, len(X) - 1, min(calls, len(X))).astype(int)].tolist()
+    model.decision_function(scaler.transform([rows[0]]))  # warm-up
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.decision_function(scaler.transform([row]))
+        timings.append(time.perf_counter() - start)
+    return 1000.0 * float(np.median(timings))
+
+
+def artifact_kb(model_data):
+    buf = io.BytesIO()
+    joblib.dump(model_data, buf)
+    return buf.tell() / 1024.0
+
+
+def agreement(reference, candidate):
+    """Balanced agreement of anomaly decisions (score < 0) with the reference.
+
+    Plain agreement would reward a model that never fires, since ~90% of
+    the rows are normal; averaging over both classes doesn't.
+    """
+    ref, cand = reference < 0, candidate < 0
+    parts = [np.mean(cand[ref] == ref[ref]) if ref.any() else 1.0,
+             np.mean(cand[~ref] == ref[~ref]) if (~ref).any() else 1.0]
+    return float(np.mean(parts)), float(np.mean(ref == cand))
+
+
+def search(X, scaler, base_data, contamination, latency_ms, memory_kb,
+           min_agreement, slowdown=1.0):
+    """Returns (chosen model_data or None, report dict).
+
+    `slowdown` scales the latency measured here to the target board, e.g. 8
+    when training on a laptop for a Pi Zero.
+    """
+    X_scaled = scaler.transform(X)
+    reference = base_data["model"].decision_function(X_scaled)
+    full = {
+        "n_estimators": base_data["model"].n_estimators,
+        "max_samples": int(base_data["model"].max_samples_),
+        "latency_ms": score_latency_ms(base_data["model"], scaler, X) * slowdown,
+        "size_kb": artifact_kb(base_data),
+    }
+
+    candidates = []
+    for n in N_ESTIMATORS:
+        for m in MAX_SAMPLES:
+            if m > len(X_scaled):
+                continue
+            model = IsolationForest(n_estimators=n, max_samples=m,
+                                    contamination=contamination, random_state=42)
+            model.fit(X_scaled)
+            data = dict(base_data, model=model)
+            balanced, plain = agreement(reference, model.decision_function(X_scaled))
+            row = {
+                "n_estimators": n,
+                "max_samples": m,
+                "latency_ms": score_latency_ms(model, scaler, X) * slowdown,
+                "size_kb": artifact_kb(data),
+                "agreement": balanced,
+                "plain_agreement": plain,
+            }
+            row["fits"] = (row["latency_ms"] <= latency_ms and row["size_kb"] <= memory_kb
+                           and balanced >= min_agreement)
+            candidates.append((row, data))
+
+    fitting = [(row, data) for row, data in candidates if row["fits"]]
+    chosen = min(fitting, key=lambda c: (c[0]["n_estimators"], c[0]["max_samples"]), default=None)
+    report = {
+        "budget": {"latency_ms": latency_ms, "memory_kb": memory_kb,
+                   "min_agreement": min_agreement, "slowdown": slowdown},
+        "rows": len(X_scaled),
+        "full_model": full,
+        "chosen": chosen[0] if chosen else None,
+        "candidates": [row for row, _ in candidates],
+    }
+    if chosen is None:
+        return None, report
+    return dict(chosen[1], budget=chosen[0]), report
@@ -4,6 +4,7 @@ import plotly.graph_objects as go
 import time
 import json
 import os
+from live_export import LiveHtmlExporter, num
 
 # Load config
 with open("config.json") as f:
@@ -12,7 +13,66 @@ with open("config.json") as f:
 DATA_PATH = CONFIG["LOGGING"]["anomaly_log_file"]
 REFRESH_INTERVAL = CONFIG["LOGGING"].get("interval_sec", 2)
 
+EXPORT_MODE = CONFIG.get("PLOTTING", {}).get("export_mode", "incremental")
+OUTPUT_HTML = "live_plot.html"
+
+
+def build_figure(df):
+    fig = go.Figure()
+
+    # Plot sensor values
+    fig.add_trace(go.Scatter(
+        x=df['Timestamp'], y=df['Temperature'],
+        mode='lines+markers', name='Temperature', line=dict(color='red')))
+
+    fig.add_trace(go.Scatter(
+        x=df['Timestamp'], y=df['Humidity'],
+        mode='lines+markers', name='Humidity', line=dict(color='blue')))
+
+    fig.add_trace(go.Scatter(
+        x=df['Timestamp'], y=df['Motion'],
+        mode='lines+markers', name='Motion', line=dict(color='green')))
+
+    # Highlight anomalies if present
+    if "Prediction" in df.columns:
+        anomalies = df[df['Prediction'] == -1]
+        fig.add_trace(go.Scatter(
+            x=anomalies['Timestamp'], y=anomalies['Temperature'],
+            mode='markers', name='Anomalies (Temp)',
+            marker=dict(size=10, color='orange', symbol='x')
+        ))
+
+    # Chart layout
+    fig.update_layout(
+        title="Live Sensor Data with Anomalies",
+        xaxis_title="Timestamp",
+        yaxis_title="Sensor Values",
+        xaxis=dict(rangeslider_visible=True),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        template="plotly_white",
+        height=600
+    )
+    return fig
+
+
+def new_points(rows):
+    # Same traces, same order as build_figure()
+    ts = [r['Timestamp'] for r in rows]
+    traces = [
+        (ts, [num(r['Temperature']) for r in rows]),
+        (ts, [num(r['Humidity']) for r in rows]),
+        (ts, [num(r['Motion']) for r in rows]),
+    ]
+    if rows and "Prediction" in rows[0]:
+        anomalies = [r for r in rows if num(r['Prediction']) == -1]
+        traces.append(([r['Timestamp'] for r in anomalies], [num(r['Temperature']) for r in anomalies]))
+    return traces
+
+
 print("📊 Live Plotting Started (HTML export mode). Press CTRL+C to stop...\n")
+exporter = LiveHtmlExporter(DATA_PATH, OUTPUT_HTML, build_figure, new_points, poll_sec=REFRESH_INTERVAL,
+                            archive_dir=CONFIG["LOGGING"]["archive_dir"],
+                            history_hours=CONFIG.get("PLOTTING", {}).get("history_hours", 24))
 
 try:
     while True:
@@ -21,49 +81,24 @@ try:
             time.sleep(REFRESH_INTERVAL)
             continue
 
+        if EXPORT_MODE == "incremental":
+            # Only touches disk when the CSV changed; usually just the small data file
+            result = exporter.refresh()
+            if result == "page":
+                print(f"📁 Chart saved as {OUTPUT_HTML} (plotly.min.js alongside) — download to your Mac to view.")
+            elif result == "data":
+                print(f"📁 New points written to {exporter.data_path}")
+            time.sleep(REFRESH_INTERVAL * 5)
+            continue
+
         df = pd.read_csv(DATA_PATH)
         if df.empty:
             print("No data to plot yet.")
             time.sleep(REFRESH_INTERVAL)
             continue
 
-        fig = go.Figure()
-
-        # Plot sensor values
-        fig.add_trace(go.Scatter(
-            x=df['Timestamp'], y=df['Temperature'],
-            mode='lines+markers', name='Temperature', line=dict(color='red')))
-
-        fig.add_trace(go.Scatter(
-            x=df['Timestamp'], y=df['Humidity'],
-            mode='lines+markers', name='Humidity', line=dict(color='blue')))
-
-        fig.add_trace(go.Scatter(
-            x=df['Timestamp'], y=df['Motion'],
-            mode='lines+markers', name='Motion', line=dict(color='green')))
-
-        # Highlight anomalies if present
-        if "Prediction" in df.columns:
-            anomalies = df[df['Prediction'] == -1]
-            fig.add_trace(go.Scatter(
-                x=anomalies['Timestamp'], y=anomalies['Temperature'],
-                mode='markers', name='Anomalies (Temp)',
-                marker=dict(size=10, color='orange', symbol='x')
-            ))
-
-        # Chart layout
-        fig.update_layout(
-            title="Live Sensor Data with Anomalies",
-            xaxis_title="Timestamp",
-            yaxis_title="Sensor Values",
-            xaxis=dict(rangeslider_visible=True),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            template="plotly_white",
-            height=600
-        )
-
         # Export as HTML
-        fig.write_html("live_plot.html")
+        build_figure(df).write_html(OUTPUT_HTML)
         print("📁 Chart saved as live_plot.html — download to your Mac to view.")
 
         time.sleep(REFRESH_INTERVAL * 5)
@@ -1,13 +1,15 @@
 import time
-import board
-import adafruit_dht
-import RPi.GPIO as GPIO
-import pandas as pd
-import numpy as np
-import joblib
 import json
-from datetime import datetime
 import os
+from acquisition import acquisition_from_config
+from alerts import alerts_from_config
+from episodes import EpisodeTracker, TraceSampler
+from features import IncrementalFeatures
+from log_lock import log_lock
+from metrics import setup_metrics
+from scheduler import motion_started, readings_changed, scheduler_from_config
+from scoring_service import load_scorer
+from sim_sensors import load_dht, load_gpio
 
 # Load config
 with open("config.json") as f:
@@ -20,20 +22,20 @@ BUZZER_PIN = CONFIG["GPIO"]["BUZZER_PIN"]
 LED_PIN = CONFIG["GPIO"]["LED_PIN"]
 MODEL_PATH = CONFIG["MODEL"]["model_path"]
 ANOMALY_LOG = CONFIG["LOGGING"]["anomaly_log_file"]
+EPISODE_LOG = CONFIG["LOGGING"]["episode_log_file"]
 INTERVAL = CONFIG["LOGGING"]["interval_sec"]
-ROLLING = CONFIG["MODEL"]["rolling_window"]
 
-# GPIO setup
+# GPIO setup (mock_gpio + SimulatedDHT with MOCK_GPIO=1)
+GPIO = load_gpio()
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(PIR_PIN, GPIO.IN)
 GPIO.setup(BUZZER_PIN, GPIO.OUT)
 GPIO.setup(LED_PIN, GPIO.OUT)
-dht_sensor = adafruit_dht.DHT11(board.D4)
+dht_sensor = load_dht(DHT_PIN)
 
-# Load model and scaler
-model_data = joblib.load(MODEL_PATH)
-model = model_data["model"]
-scaler = model_data["scaler"]
+# Model and scaler: the shared scoring service if SCORING.enabled, else loaded here
+scorer = load_scorer(CONFIG)
+WINDOW_SEC = scorer.window_sec  # must match what the model saw in training
 
 # Make sure log directory exists
 os.makedirs(os.path.dirname(ANOMALY_LOG), exist_ok=True)
@@ -43,61 +45,99 @@ if not os.path.isfile(ANOMALY_LOG):
     with open(ANOMALY_LOG, mode='w') as f:
         f.write("Timestamp,Temperature,Humidity,Motion,Prediction\n")
 
-# Live buffer
-data_buffer = []
+# Streaming feature state
+features = IncrementalFeatures(WINDOW_SEC)
+
+# Anomaly episodes, plus an optional sampled per-tick trace
+episodes = EpisodeTracker(EPISODE_LOG, CONFIG["LOGGING"].get("episode_close_after", 1))
+trace = TraceSampler(CONFIG["LOGGING"].get("trace_every", 1))
+
+# Per-stage timings and counters (see metrics.py)
+metrics = setup_metrics("realtime_detector", CONFIG.get("METRICS"))
+
+# PIR and DHT read concurrently with per-sensor timeouts; DHT retries run in the background
+acquisition = acquisition_from_config(CONFIG, GPIO, dht_sensor, metrics)
+
+# Buzzer/LED/Telegram with hysteresis; pins change only on alarm transitions
+alerts = alerts_from_config(CONFIG, GPIO, metrics)
+
+# Deadline pacing; bursts when motion starts or on anomalies, backs off while stable
+scheduler = scheduler_from_config(CONFIG)
+last_reading = last_motion = None
 print("🔍 Starting real-time anomaly detection...\n")
 
 try:
     while True:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        motion = GPIO.input(PIR_PIN)
-
-        try:
-            temp = dht_sensor.temperature
-            hum = dht_sensor.humidity
-            if temp is None or hum is None:
-                raise ValueError("Invalid DHT reading")
-        except Exception as e:
-            print(f"[WARN] Sensor read error: {e}")
-            time.sleep(INTERVAL)
+        missed = scheduler.wait()
+        if missed:
+            metrics.inc("missed_deadlines", missed)
+        metrics.set("interval_seconds", scheduler.interval)
+        tick_start = time.perf_counter()
+        metrics.inc("ticks")
+        with metrics.span("acquire"):
+            readings = acquisition.read()
+        pir, dht = readings["pir"], readings["dht"]
+        # A cached PIR value would score the previous tick's sample again
+        if not pir.fresh or dht.value is None:
+            missing = "PIR timed out" if not pir.fresh else f"no recent DHT reading ({acquisition.readers['dht'].last_error})"
+            print(f"[WARN] Sensor read error: {missing}")
+            metrics.inc("dropped_samples")
             continue
-
-        # Update buffer
-        data_buffer.append([temp, hum, motion])
-        if len(data_buffer) > ROLLING:
-            data_buffer.pop(0)
-
-        if len(data_buffer) < ROLLING:
+        # Stamped when the PIR was sampled (same resolution as the log); the
+        # DHT value may be up to ACQUISITION.dht_max_age_sec older
+        now = pir.acquired_at.replace(microsecond=0)
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        motion = pir.value
+        temp, hum = dht.value
+
+        # Update rolling features
+        with metrics.span("features"):
+            feature_row = features.update(now, temp, hum, motion)
+
+        if feature_row is None:
             print(f"[{timestamp}] ⏳ Waiting for enough data...")
         else:
-            df = pd.DataFrame(data_buffer, columns=["Temp", "Humidity", "Motion"])
-            mean_row = df.mean().to_frame().T  # DataFrame with column names
-            scaled_input = scaler.transform(mean_row)
-            pred = model.predict(scaled_input)[0]
+            with metrics.span("predict"):
+                # Scaling happens in the scorer; IsolationForest.predict() is
+                # just decision_function() < 0
+                score = scorer.decision_function([feature_row])[0]
+            pred = -1 if score < 0 else 1
             status = "🚨 Anomaly" if pred == -1 else "✅ Normal"
+            if pred == -1:
+                metrics.inc("anomalies")
+                scheduler.burst()
 
             # Show result
             print(f"[{timestamp}] Temp: {temp}°C | Humidity: {hum}% | Motion: {motion} → {status}")
 
-            # Trigger alerts
-            if pred == -1:
-                if CONFIG["ALERTS"]["use_buzzer"]:
-                    GPIO.output(BUZZER_PIN, GPIO.HIGH)
-                if CONFIG["ALERTS"]["use_led"]:
-                    GPIO.output(LED_PIN, GPIO.HIGH)
-            else:
-                GPIO.output(BUZZER_PIN, GPIO.LOW)
-                GPIO.output(LED_PIN, GPIO.LOW)
+            # Trigger alerts (patterns and Telegram run in the background)
+            with metrics.span("alert"):
+                event = alerts.update(pred, now, (temp, hum, motion), score)
+            if event:
+                metrics.inc(f"alerts_{event}")
+
+            # Log episodes, and the sampled per-tick trace
+            with metrics.span("csv_append"):
+                if episodes.update(now, score, (temp, hum, motion), feature_row):
+                    metrics.inc("episodes")
+                if trace.keep(pred):
+                    with log_lock(ANOMALY_LOG), open(ANOMALY_LOG, mode='a') as f:
+                        f.write(f"{timestamp},{temp},{hum},{motion},{pred}\n")
 
-            # Log anomaly
-            with open(ANOMALY_LOG, mode='a') as f:
-                f.write(f"{timestamp},{temp},{hum},{motion},{pred}\n")
+        # Adapt the sampling rate for the next tick
+        if motion_started(last_motion, motion):
+            scheduler.burst()
+        scheduler.update(readings_changed(last_reading, temp, hum, CONFIG.get("SCHEDULER", {})))
+        last_reading, last_motion = (temp, hum), motion
 
-        time.sleep(INTERVAL)
+        metrics.observe("tick", time.perf_counter() - tick_start)
 
 except KeyboardInterrupt:
     print("\n🛑 Detection stopped by user.")
 
 finally:
+    acquisition.close()
+    alerts.close()
+    episodes.close()
     dht_sensor.exit()
     GPIO.cleanup()
@@ -0,0 +1,110 @@
+# scheduler.py
+# Deadline-based loop pacing with an adaptive sampling rate.
+#
+# Ticks fire on absolute deadlines (start + k * interval) instead of
+# sleeping a fixed INTERVAL after the work, so processing time doesn't
+# stretch the period. The interval drops to a burst rate when motion
+# starts or on anomalies, and backs off while readings stay stable.
+import time
+
+
+class AdaptiveScheduler:
+    def __init__(self, interval, min_interval=None, max_interval=None,
+                 burst_hold=30, stable_ticks=15, backoff=1.5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.base_interval = interval
+        self.min_interval = min_interval or interval
+        self.max_interval = max_interval or interval
+        self.burst_hold = burst_hold
+        self.stable_ticks = stable_ticks
+        self.backoff = backoff
+        self.clock = clock
+        self.sleep = sleep
+
+        self.interval = interval
+        self.next_deadline = None
+        self.burst_until = 0.0
+        self.stable_count = 0
+        self.missed_total = 0
+        self.last_lateness = 0.0
+
+    def wait(self):
+        """Block until the next deadline; returns how many deadlines were missed."""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        missed = 0
+        if now < self.next_deadline:
+            self.sleep(self.next_deadline - now)
+            fired = self.next_deadline
+            self.last_lateness = 0.0
+        else:
+            # Overran one or more periods: skip the slots we can't make
+            # instead of firing them back to back
+            late = now - self.next_deadline
+            missed = int(late // self.interval)
+            fired = self.next_deadline + missed * self.interval
+            self.last_lateness = late - missed * self.interval
+            self.missed_total += missed
+        self.next_deadline = fired + self.interval
+        return missed
+
+    def _set_interval(self, interval):
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        if interval != self.interval and self.next_deadline is not None:
+            # Re-anchor on the last fired deadline so the new rate applies
+            # now; never move the deadline into the past (not a real miss)
+            fired = self.next_deadline - self.interval
+            self.next_deadline = max(self.clock(), fired + interval)
+        self.interval = interval
+
+    def burst(self):
+        """Something is happening (motion, anomaly): sample fast for a while."""
+        self.burst_until = self.clock() + self.burst_hold
+        self.stable_count = 0
+        self._set_interval(self.min_interval)
+
+    def update(self, changed):
+        """Report whether this tick's readings changed meaningfully."""
+        if self.clock() < self.burst_until:
+            return
+        if self.interval < self.base_interval:
+            self._set_interval(self.base_interval)  # burst is over
+        if changed:
+            self.stable_count = 0
+            self._set_interval(self.base_interval)
+            return
+        self.stable_count += 1
+        if self.stable_count >= self.stable_ticks:
+            self.stable_count = 0
+            self._set_interval(self.interval * self.backoff)
+
+
+def scheduler_from_config(config):
+    """Build a scheduler from config.json's LOGGING + SCHEDULER sections."""
+    interval = config["LOGGING"]["interval_sec"]
+    settings = config.get("SCHEDULER", {})
+    if not settings.get("adaptive", False):
+        return AdaptiveScheduler(interval)
+    return AdaptiveScheduler(
+        interval,
+        min_interval=settings.get("min_interval_sec", interval),
+        max_interval=settings.get("max_interval_sec", interval),
+        burst_hold=settings.get("burst_hold_sec", 30),
+        stable_ticks=settings.get("stable_ticks", 15),
+        backoff=settings.get("backoff_factor", 1.5),
+    )
+
+
+def motion_started(prev, motion):
+    """True on a PIR rising edge. A PIR that stays high (as it mostly does in
+    the logged data) would otherwise keep the loop at the burst rate."""
+    return bool(motion) and prev is not None and not prev
+
+
+def readings_changed(prev, temp, hum, settings):
+    """True if temperature/humidity moved more than the SCHEDULER thresholds."""
+    if prev is None or temp is None or hum is None or None in prev:
+        return True
+    return (abs(temp - prev[0]) >= settings.get("stable_temp_delta", 0.3)
+            or abs(hum - prev[1]) >= settings.get("stable_hum_delta", 1.0))
@@ -0,0 +1,353 @@
+# scoring_service.py
+# Local scoring daemon: one copy of the model, shared over a Unix socket.
+#
+# realtime_detector.py, dashboard.py and ad-hoc scripts each used to load
+# models/isolation_forest.pkl and score one row at a time. The daemon holds
+# the model and scaler once; requests that arrive within batch_window_ms
+# of each other are stacked into one scaler.transform + decision_function
+# call and the scores are handed back to each caller.
+#
+#   python scoring_service.py            # run the daemon
+#   python scoring_service.py --bench    # throughput / p99 vs client count
+#
+# Wire format (little-endian): the server greets each connection with a
+# length-prefixed JSON header (features, feature_version, window_sec). A
+# request is <uint32 rows><rows x features float64>; a reply is
+# <uint8 status><uint32 n> followed by n float64 scores (status 0) or an
+# n-byte error message.
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+REQUEST = struct.Struct("<I")
+REPLY = struct.Struct("<BI")
+HELLO = struct.Struct("<I")
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("scoring service closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+class LocalScorer:
+    """The model loaded in-process; same API as ScoringClient."""
+
+    def __init__(self, model_path):
+        import joblib
+        from features import check_model_features
+
+        model_data = joblib.load(model_path)
+        check_model_features(model_data)
+        self.model = model_data["model"]
+        self.scaler = model_data["scaler"]
+        self.features = model_data["features"]
+        self.feature_version = model_data["feature_version"]
+        self.window_sec = model_data["window_sec"]
+
+    def decision_function(self, rows):
+        """Scores for raw (unscaled) feature rows; < 0 means anomaly."""
+        return self.model.decision_function(self.scaler.transform(np.asarray(rows, dtype=np.float64)))
+
+    def predict(self, rows):
+        return np.where(self.decision_function(rows) < 0, -1, 1)
+
+    def close(self):
+        pass
+
+
+class ScoringClient:
+    """Talks to the daemon. A failed call (dropped connection, timeout,
+    restarted daemon) reconnects once; if that fails too, calls go to
+    `fallback()` (a LocalScorer) and the daemon is retried, with a single
+    attempt, every `retry_sec`. Calls run on the loop's tick, so `timeout`
+    stays small: a hung daemon costs a tick at most 2 * timeout, once.
+    Not thread-safe: use one client per thread."""
+
+    def __init__(self, socket_path, timeout=0.25, fallback=None, retry_sec=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self.retry_sec = retry_sec
+        self.local = None
+        self.retry_at = 0.0
+        self.sock = None
+        self._connect()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            (size,) = HELLO.unpack(_recv_exact(sock, HELLO.size))
+            hello = json.loads(_recv_exact(sock, size))
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.features = hello["features"]
+        self.feature_version = hello["feature_version"]
+        self.window_sec = hello["window_sec"]
+
+    def _call(self, X):
+        self.sock.sendall(REQUEST.pack(len(X)) + X.tobytes())
+        status, n = REPLY.unpack(_recv_exact(self.sock, REPLY.size))
+        if status != 0:
+            raise ValueError(_recv_exact(self.sock, n).decode())
+        return np.frombuffer(_recv_exact(self.sock, 8 * n), dtype="<f8")
+
+    def decision_function(self, rows):
+        """Scores for raw (unscaled) feature rows; < 0 means anomaly."""
+        X = np.ascontiguousarray(rows, dtype="<f8")
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.features):
+            raise ValueError(f"expected {len(self.features)} features per row, got {X.shape[1]}")
+        probing = self.sock is None and self.local is not None
+        if probing and time.monotonic() < self.retry_at:
+            return self.local.decision_function(X)
+        for attempt in range(1 if probing else 2):
+            try:
+                if self.sock is None:
+                    self._connect()
+                return self._call(X)
+            except OSError as e:
+                # The stream may be mid-reply: never reuse this connection
+                self.close()
+                error = e
+        if self.fallback is None:
+            raise error
+        if self.local is None:
+            print(f"[WARN] Scoring service unavailable ({error}), scoring locally")
+            self.local = self.fallback()
+        self.retry_at = time.monotonic() + self.retry_sec
+        return self.local.decision_function(X)
+
+    def predict(self, rows):
+        return np.where(self.decision_function(rows) < 0, -1, 1)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def load_scorer(config):
+    """ScoringClient when SCORING.enabled and the daemon is up, else LocalScorer."""
+    from features import FEATURE_COLUMNS, FEATURE_VERSION
+
+    settings = config.get("SCORING", {})
+    if settings.get("enabled", False):
+        try:
+            client = ScoringClient(settings.get("socket_path", "/tmp/hsu_scoring.sock"),
+                                   timeout=settings.get("timeout_sec", 0.25),
+                                   fallback=lambda: LocalScorer(config["MODEL"]["model_path"]),
+                                   retry_sec=settings.get("retry_sec", 30))
+        except OSError as e:
+            print(f"[WARN] Scoring service unavailable ({e}), loading the model locally")
+        else:
+            if client.features == FEATURE_COLUMNS and client.feature_version == FEATURE_VERSION:
+                return client
+            client.close()
+            print("[WARN] Scoring service runs a model with other features, loading locally")
+    return LocalScorer(config["MODEL"]["model_path"])
+
+
+class ScoringServer:
+    def __init__(self, scorer, socket_path, batch_window_ms=2.0, max_batch=256, metrics=None):
+        self.scorer = scorer
+        self.socket_path = socket_path
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.metrics = metrics
+        self.n_features = len(scorer.features)
+        self.pending = queue.Queue()
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.hello = json.dumps({
+            "features": scorer.features,
+            "feature_version": scorer.feature_version,
+            "window_sec": scorer.window_sec,
+        }).encode()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # stale socket from an earlier run
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(64)
+        threading.Thread(target=self._batcher, daemon=True).start()
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+    def _handle(self, conn):
+        # One thread per connection: read a request, queue it, wait for its scores
+        done = threading.Event()
+        with self.lock:
+            self.connections += 1
+        with conn:
+            try:
+                conn.sendall(HELLO.pack(len(self.hello)) + self.hello)
+                while True:
+                    (rows,) = REQUEST.unpack(_recv_exact(conn, REQUEST.size))
+                    data = _recv_exact(conn, 8 * rows * self.n_features)
+                    X = np.frombuffer(data, dtype="<f8").reshape(rows, self.n_features)
+                    item = {"X": X, "done": done, "scores": None, "error": None}
+                    self.pending.put(item)
+                    done.wait()
+                    done.clear()
+                    if item["error"] is not None:
+                        msg = item["error"].encode()
+                        conn.sendall(REPLY.pack(1, len(msg)) + msg)
+                    else:
+                        scores = np.ascontiguousarray(item["scores"], dtype="<f8")
+                        conn.sendall(REPLY.pack(0, len(scores)) + scores.tobytes())
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                with self.lock:
+                    self.connections -= 1
+
+    def _batcher(self):
+        while True:
+            batch = [self.pending.get()]
+            rows = len(batch[0]["X"])
+            deadline = time.perf_counter() + self.batch_window
+            # No point waiting once every connected client is in the batch
+            while rows < self.max_batch and len(batch) < self.connections:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=left)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item["X"])
+            self._score(batch, rows)
+
+    def _score(self, batch, rows):
+        start = time.perf_counter()
+        try:
+            scores = self.scorer.decision_function(np.vstack([item["X"] for item in batch]))
+        except Exception:
+            # One bad request (e.g. NaN rows) must not fail the others in
+            # its batch: score them one at a time instead
+            for item in batch:
+                try:
+                    item["scores"] = self.scorer.decision_function(item["X"])
+                except Exception as e:
+                    item["error"] = str(e)
+                    if self.metrics is not None:
+                        self.metrics.inc("request_errors")
+                item["done"].set()
+            return
+        offset = 0
+        for item in batch:
+            item["scores"] = scores[offset:offset + len(item["X"])]
+            offset += len(item["X"])
+            item["done"].set()
+        if self.metrics is not None:
+            self.metrics.observe("batch", time.perf_counter() - start)
+            self.metrics.inc("batches")
+            self.metrics.inc("requests", len(batch))
+            self.metrics.inc("rows", rows)
+            self.metrics.set("last_batch_requests", len(batch))
+
+
+def bench(config, clients_list=(1, 2, 4, 8, 16, 32), seconds=3.0):
+    """Start the daemon in a subprocess and hammer it with single-row clients."""
+    import subprocess
+    import sys
+    import tempfile
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "scoring.sock")
+    proc = subprocess.Popen([sys.executable, __file__, "--socket", socket_path],
+                            stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(200):
+            if os.path.exists(socket_path):
+                break
+            time.sleep(0.05)
+
+        local = LocalScorer(config["MODEL"]["model_path"])
+        row = np.zeros((1, len(local.features)))
+        timings = []
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            local.decision_function(row)
+            timings.append(time.perf_counter() - start)
+        print(f"📏 In-process, 1 caller: {len(timings) / seconds:8.0f} req/s, "
+              f"p99 {1000 * np.percentile(timings, 99):6.2f} ms")
+
+        for n in clients_list:
+            results = [[] for _ in range(n)]
+            stop = time.perf_counter() + seconds
+
+            def run(out):
+                client = ScoringClient(socket_path)
+                rng = np.random.default_rng(len(out))
+                while time.perf_counter() < stop:
+                    x = rng.normal(size=(1, len(client.features)))
+                    t = time.perf_counter()
+                    client.decision_function(x)
+                    out.append(time.perf_counter() - t)
+                client.close()
+
+            threads = [threading.Thread(target=run, args=(r,)) for r in results]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            timings = [x for r in results for x in r]
+            print(f"🚀 Service, {n:2d} clients: {len(timings) / seconds:8.0f} req/s, "
+                  f"p50 {1000 * np.percentile(timings, 50):6.2f} ms, "
+                  f"p99 {1000 * np.percentile(timings, 99):6.2f} ms")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from metrics import setup_metrics
+
+    with open("config.json") as f:
+        CONFIG = json.load(f)
+    SETTINGS = CONFIG.get("SCORING", {})
+
+    parser = argparse.ArgumentParser(description="Local micro-batching scoring service")
+    parser.add_argument("--socket", default=SETTINGS.get("socket_path", "/tmp/hsu_scoring.sock"))
+    parser.add_argument("--bench", action="store_true", help="report throughput and p99 per client count")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(CONFIG)
+    else:
+        scorer = LocalScorer(CONFIG["MODEL"]["model_path"])
+        metrics = setup_metrics("scoring_service", CONFIG.get("METRICS"))
+        server = ScoringServer(scorer, args.socket, SETTINGS.get("batch_window_ms", 2.0),
+                               SETTINGS.get("max_batch", 256), metrics)
+        print(f"🧠 Scoring service on {args.socket} "
+              f"(batch window {server.batch_window * 1000:g} ms, max batch {server.max_batch})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n✓ Scoring service stopped")
@@ -1,12 +1,13 @@
 # sensor_logger.py
 import time
-import board
-import adafruit_dht
-import RPi.GPIO as GPIO
 import csv
 import json
 import os
-from datetime import datetime
+from acquisition import acquisition_from_config
+from log_lock import log_lock
+from metrics import setup_metrics
+from scheduler import motion_started, readings_changed, scheduler_from_config
+from sim_sensors import load_dht, load_gpio
 
 # Load config
 with open("config.json") as f:
@@ -17,11 +18,12 @@ PIR_PIN = CONFIG["GPIO"]["PIR_PIN"]
 LOG_FILE = CONFIG["LOGGING"]["log_file"]
 INTERVAL = CONFIG["LOGGING"]["interval_sec"]
 
-# Setup GPIO
+# Setup GPIO (mock_gpio + SimulatedDHT with MOCK_GPIO=1)
+GPIO = load_gpio()
 GPIO.setmode(GPIO.BCM)
 GPIO.setup(PIR_PIN, GPIO.IN)
 
-dht_sensor = adafruit_dht.DHT11(board.D4)
+dht_sensor = load_dht(DHT_PIN)
 
 # Ensure data folder exists
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
@@ -32,30 +34,64 @@ if not os.path.isfile(LOG_FILE):
         writer = csv.writer(file)
         writer.writerow(["Timestamp", "Temperature", "Humidity", "Motion"])
 
+# Per-stage timings and counters (see metrics.py)
+metrics = setup_metrics("sensor_logger", CONFIG.get("METRICS"))
+
+# PIR and DHT read concurrently with per-sensor timeouts; DHT retries run in the background
+acquisition = acquisition_from_config(CONFIG, GPIO, dht_sensor, metrics)
+
+# Deadline pacing; bursts when motion starts, backs off while stable
+scheduler = scheduler_from_config(CONFIG)
+last_reading = last_motion = None
+
 print("📊 Logging sensor data... Press CTRL+C to stop.")
 
 try:
     while True:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        motion = GPIO.input(PIR_PIN)
+        missed = scheduler.wait()
+        if missed:
+            metrics.inc("missed_deadlines", missed)
+        metrics.set("interval_seconds", scheduler.interval)
+        tick_start = time.perf_counter()
+        metrics.inc("ticks")
+        with metrics.span("acquire"):
+            readings = acquisition.read()
+        pir, dht = readings["pir"], readings["dht"]
+        if not pir.fresh:
+            # A cached PIR value would repeat the last row, timestamp included
+            print("[WARN] PIR read timed out")
+            metrics.inc("dropped_samples")
+            continue
+        # The row is stamped when the PIR was sampled
+        timestamp = pir.acquired_at.strftime("%Y-%m-%d %H:%M:%S")
+        motion = pir.value
+        # Only this tick's DHT reading is logged; a cached one is left empty
+        temperature, humidity = dht.value if dht.fresh else (None, None)
+        if dht.value is None:
+            print(f"[WARN] No recent DHT reading: {acquisition.readers['dht'].last_error}")
+        elif not dht.fresh and dht.age >= acquisition.readers["dht"].min_period:
+            # Inside the DHT's min period there is no new reading to wait for
+            print(f"[WARN] DHT read pending (last reading {dht.age:.1f}s ago); logging it as missing")
+
+        with metrics.span("csv_append"):
+            with log_lock(LOG_FILE), open(LOG_FILE, mode='a', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow([timestamp, temperature, humidity, motion])
 
-        try:
-            temperature = dht_sensor.temperature
-            humidity = dht_sensor.humidity
-        except RuntimeError as e:
-            print(f"[WARN] DHT Read Error: {e.args[0]}")
-            temperature, humidity = None, None
+        # Adapt the sampling rate for the next tick
+        if motion_started(last_motion, motion):
+            scheduler.burst()
+        scheduler.update(readings_changed(last_reading, temperature, humidity, CONFIG.get("SCHEDULER", {})))
+        last_reading, last_motion = (temperature, humidity), motion
 
-        with open(LOG_FILE, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([timestamp, temperature, humidity, motion])
+        metrics.observe("tick", time.perf_counter() - tick_start)
 
         print(f"[{timestamp}] Temp: {temperature}°C | Humidity: {humidity}% | Motion: {motion}")
-        time.sleep(INTERVAL)
 
 except KeyboardInterrupt:
     print("\n🛑 Logging stopped by user.")
 
 finally:
+    acquisition.close()
     dht_sensor.exit()
     GPIO.cleanup()
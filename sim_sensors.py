@@ -0,0 +1,67 @@
+# sim_sensors.py
+# Off-device DHT11 stand-in, plus the loaders every loop uses to pick the
+# real hardware or its stand-ins (mock_gpio for the GPIO pins).
+#
+# SimulatedDHT follows adafruit_dht's interface (temperature / humidity
+# properties, exit()) with a slow daily cycle, sensor noise and the
+# occasional RuntimeError the real DHT11 throws. Time comes from
+# time.time(), so it follows whatever clock the caller runs on.
+import math
+import os
+import random
+import time
+
+
+class SimulatedDHT:
+    def __init__(self, pin, error_rate=0.05, seed=None,
+                 temp=(25.3, 0.3, 0.05), hum=(29.0, 0.5, 0.2)):
+        """temp / hum: (mean, daily swing, noise), close to data/sensor_log.csv."""
+        self.pin = pin
+        self.error_rate = error_rate
+        self.temp = temp
+        self.hum = hum
+        self.rng = random.Random(seed)
+        self._last = None   # (temperature, humidity, time)
+
+    def _measure(self):
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("Checksum did not validate. Try again.")
+        now = time.time()
+        day = 2 * math.pi * (now % 86400) / 86400
+        temp = self.temp[0] + self.temp[1] * math.sin(day) + self.rng.gauss(0, self.temp[2])
+        hum = self.hum[0] - self.hum[1] * math.sin(day) + self.rng.gauss(0, self.hum[2])
+        self._last = (round(temp, 1), float(round(hum)), now)
+
+    @property
+    def temperature(self):
+        self._measure()
+        return self._last[0]
+
+    @property
+    def humidity(self):
+        # Like adafruit_dht, reuse a measurement younger than 2 seconds
+        if self._last is None or time.time() - self._last[2] >= 2.0:
+            self._measure()
+        return self._last[1]
+
+    def exit(self):
+        pass
+
+
+def load_gpio():
+    """RPi.GPIO on the Pi; mock_gpio when MOCK_GPIO=1 (off-device runs)."""
+    if os.environ.get("MOCK_GPIO"):
+        import mock_gpio as GPIO
+    else:
+        import RPi.GPIO as GPIO
+    return GPIO
+
+
+def load_dht(pin):
+    """adafruit_dht.DHT11 on the Pi; SimulatedDHT when MOCK_GPIO=1."""
+    if os.environ.get("MOCK_GPIO"):
+        return SimulatedDHT(pin)
+    import adafruit_dht
+    import board
+
+    return adafruit_dht.DHT11(getattr(board, f"D{pin}"))
@@ -0,0 +1,474 @@
+# soak.py
+# Long-run soak / leak check for the always-on loops.
+#
+# Each loop runs in its own process against simulated sensors (mock_gpio,
+# sim_sensors.SimulatedDHT) on virtual time, so weeks of ticks take
+# minutes. Every `sample_every_sec` of simulated time we record RSS,
+# tracemalloc's traced size, open file descriptors and per-tick latency
+# percentiles. After a warm-up we fit a trend to each series and fail on
+# growth above the SOAK limits in config.json, as long as the growth over
+# the run is also bigger than the noise floor (a short run can't tell a
+# slow leak from the allocator settling). The JSON report keeps the
+# samples and the top allocators so runs can be compared across releases.
+#
+# Only the sleeping is skipped: each tick still does its real work, so the
+# detector (one model call per tick) is the slow one: about 1.5 hours of
+# wall time per simulated day, or a quarter of that with --no-tracemalloc.
+# The default three days are a nightly run, the shortest for which the
+# per-day limits sit above the noise floors; use --days 14 before a release.
+# tests/test_soak.py runs the whole harness on a few simulated minutes.
+#
+#   python soak.py
+#   python soak.py --days 14 --no-tracemalloc
+#   python soak.py --loops sensor_logger,level3 --days 2 --compare data/soak/<old>.json
+import argparse
+import datetime as _datetime
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+LOOPS = ["sensor_logger", "realtime_detector", "dashboard", "level3"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+class Sampler:
+    """Collects tick latencies and periodic resource samples (child side)."""
+
+    def __init__(self, sample_every, trace=True):
+        self.sample_every = sample_every
+        self.trace = trace
+        self.samples = []
+        self.latencies = []
+        self.ticks = 0
+        self.next_sample = 0.0
+        self.baseline = None
+        if trace:
+            tracemalloc.start()
+
+    def tick(self, seconds):
+        self.latencies.append(seconds)
+        self.ticks += 1
+
+    def maybe_sample(self, virtual_sec, warmup_sec):
+        if virtual_sec < self.next_sample:
+            return
+        self.next_sample = virtual_sec + self.sample_every
+        gc.collect()  # garbage waiting on the cycle collector isn't a leak
+        if self.trace and self.baseline is None and virtual_sec >= warmup_sec:
+            # Before measuring, so the snapshot's own memory lands in every steady sample
+            self.baseline = tracemalloc.take_snapshot()
+        lat = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        self.samples.append({
+            "day": virtual_sec / 86400,
+            "ticks": self.ticks,
+            "rss_mb": rss_mb(),
+            "traced_mb": tracemalloc.get_traced_memory()[0] / 2**20 if self.trace else None,
+            "fds": open_fds(),
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p99_ms": float(np.percentile(lat, 99)),
+            "max_ms": float(lat.max()),
+        })
+        self.latencies = []
+
+    def allocators(self, limit=10):
+        if not self.trace:
+            return {}
+        snapshot = tracemalloc.take_snapshot()
+        top = [{"where": str(s.traceback), "kb": s.size / 1024, "count": s.count}
+               for s in snapshot.statistics("lineno")[:limit]]
+        growth = []
+        if self.baseline is not None:
+            growth = [{"where": str(s.traceback), "kb_diff": s.size_diff / 1024, "count_diff": s.count_diff}
+                      for s in snapshot.compare_to(self.baseline, "lineno")[:limit]]
+        return {"top": top, "growth_since_warmup": growth}
+
+
+# ---------- child side: one loop per process ----------
+
+def install_virtual_time(duration, sampler, warmup, on_tick=None):
+    """Replace time.time/monotonic/sleep and datetime.now with a clock that
+    only moves on sleep(). Wall time between sleeps is the tick latency;
+    once `duration` simulated seconds have passed, sleep() raises
+    KeyboardInterrupt so the loop shuts down through its normal path."""
+    state = {"t": 0.0, "woke": time.perf_counter()}
+    base = time.time()
+    real_sleep = time.sleep
+
+    def sleep(seconds):
+        sampler.tick(time.perf_counter() - state["woke"])
+        state["t"] += max(0.0, seconds)
+        sampler.maybe_sample(state["t"], warmup)
+        if on_tick is not None:
+            on_tick(state["t"])
+        if state["t"] >= duration:
+            raise KeyboardInterrupt
+        real_sleep(0)  # let background threads run
+        state["woke"] = time.perf_counter()
+
+    class VirtualDatetime(_datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return _datetime.datetime.fromtimestamp(base + state["t"], tz)
+
+    time.time = lambda: base + state["t"]
+    time.monotonic = lambda: state["t"]
+    time.sleep = sleep
+    _datetime.datetime = VirtualDatetime
+
+
+def run_script(name, days, sampler, warmup):
+    import runpy
+
+    import mock_gpio
+    # C extensions check datetime's size on import: load them before
+    # install_virtual_time() swaps in the subclass
+    import pandas  # noqa: F401
+    import sklearn.ensemble  # noqa: F401
+
+    with open("config.json") as f:
+        config = json.load(f)
+    pir = config["GPIO"]["PIR_PIN"]
+    rng = random.Random(7)
+
+    def drive_pir(now):
+        # Like the logged data: PIR mostly high, with the odd short drop
+        if not mock_gpio.input(pir) or rng.random() < 0.01:
+            mock_gpio.set_input(pir, 1 - mock_gpio.input(pir))
+        mock_gpio.history.clear()  # the mock's own record of alert pin writes
+
+    install_virtual_time(days * 86400, sampler, warmup, drive_pir)
+    runpy.run_path(os.path.join(HERE, name + ".py"), run_name="__main__")
+
+
+def run_level3(days, sampler, warmup):
+    import level3
+    import level3_sim
+    import mock_gpio
+    from soil_sensor import VirtualClock
+
+    class TimedClock(VirtualClock):
+        # Wall time spent outside sleep()/wait() is the controller's own work
+        woke = None
+
+        def _mark(self):
+            if self.woke is not None:
+                sampler.tick(time.perf_counter() - self.woke)
+
+        def sleep(self, seconds):
+            self._mark()
+            super().sleep(seconds)
+            self.woke = time.perf_counter()
+
+        def wait(self, event, timeout=None):
+            self._mark()
+            result = super().wait(event, timeout)
+            self.woke = time.perf_counter()
+            return result
+
+    clock = TimedClock()
+    mock_gpio.reset()
+    mock_gpio.clock = clock.monotonic
+    level3.clock = clock
+    level3.METRICS_PORT = 0
+    level3.send_email = lambda: True
+    level3.LOG_FILE = os.path.abspath("watering_log.csv")
+    level3.setup()
+    level3_sim.SoilModel(clock, **level3_sim.SCENARIOS["hot"]).start()
+
+    def sample():
+        sampler.maybe_sample(clock.monotonic(), warmup)
+        mock_gpio.history.clear()  # the simulator's own record, not the controller's
+        clock.call_at(clock.monotonic() + sampler.sample_every, sample)
+
+    clock.call_at(0, sample)
+    level3.control_loop(until=days * 86400)
+    sampler.maybe_sample(days * 86400, warmup)
+
+
+def run_dashboard(days, sampler, warmup, step_sec, sessions):
+    from streamlit.testing.v1 import AppTest
+
+    from sim_sensors import SimulatedDHT
+
+    with open("config.json") as f:
+        config = json.load(f)
+    path = config["LOGGING"]["anomaly_log_file"]
+    interval = config["LOGGING"]["interval_sec"]
+    scheduler = config.get("SCHEDULER", {})
+    if scheduler.get("adaptive", False):
+        # The detector's burst rate, which the dashboard sizes its buffer for
+        interval = min(interval, scheduler.get("min_interval_sec", interval))
+    dht = SimulatedDHT(0, error_rate=0.0, seed=3)
+    rng = random.Random(5)
+    start = _datetime.datetime(2025, 1, 1)
+    with open(path, "w") as f:
+        f.write("Timestamp,Temperature,Humidity,Motion,Prediction\n")
+
+    apps = [AppTest.from_file(os.path.join(HERE, "dashboard.py"), default_timeout=60)
+            for _ in range(sessions)]
+    t = 0.0
+    while t < days * 86400:
+        # The detector's trace for the next step, then every session refreshes
+        with open(path, "a") as f:
+            for k in range(int(step_sec // interval)):
+                ts = start + _datetime.timedelta(seconds=t + k * interval)
+                f.write(f"{ts:%Y-%m-%d %H:%M:%S},{dht.temperature},{dht.humidity},"
+                        f"{int(rng.random() < 0.1)},{-1 if rng.random() < 0.05 else 1}\n")
+        t += step_sec
+        tick_start = time.perf_counter()
+        for app in apps:
+            app.run()
+        sampler.tick(time.perf_counter() - tick_start)
+        sampler.maybe_sample(t, warmup)
+
+
+def child(args, settings):
+    sampler = Sampler(settings["sample_every_sec"], trace=not args.no_tracemalloc)
+    warmup = args.days * 86400 * settings["warmup_fraction"]
+    error = None
+    try:
+        if args.child == "level3":
+            run_level3(args.days, sampler, warmup)
+        elif args.child == "dashboard":
+            with open("config.json") as f:
+                hours = json.load(f).get("DASHBOARD", {}).get("max_hours", 24)
+            # Memory only levels off once the dashboard's row buffer is full
+            warmup = max(warmup, hours * 3600 + settings["dashboard_step_sec"])
+            run_dashboard(args.days, sampler, warmup, settings["dashboard_step_sec"],
+                          settings["dashboard_sessions"])
+        else:
+            run_script(args.child, args.days, sampler, warmup)
+    except SystemExit:
+        pass
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    result = {"samples": sampler.samples, "allocators": sampler.allocators(), "error": error,
+              "warmup_day": warmup / 86400}
+    with open(args.out, "w") as f:
+        json.dump(result, f)
+
+
+# ---------- parent side ----------
+
+def soak_config(config, workdir, days):
+    """config.json for a soak run: data in `workdir`, no ports, no network."""
+    config = json.loads(json.dumps(config))
+    for key in ("log_file", "anomaly_log_file", "episode_log_file"):
+        config["LOGGING"][key] = os.path.join(workdir, os.path.basename(config["LOGGING"][key]))
+    config["LOGGING"]["archive_dir"] = os.path.join(workdir, "archive")
+    config["MODEL"]["model_path"] = os.path.join(HERE, config["MODEL"]["model_path"])
+    config.setdefault("METRICS", {})["enabled"] = False
+    config.setdefault("SCORING", {})["enabled"] = False
+    config["ALERTS"]["use_telegram"] = False
+    # Acquisition waits are real time; the simulated DHT answers instantly
+    config.setdefault("ACQUISITION", {})["dht_retry_sec"] = 0
+    dashboard = config.setdefault("DASHBOARD", {})
+    dashboard["snapshot_ttl_sec"] = 0  # refresh on every run
+    # Keep the dashboard's buffer small enough to fill within the first half of the run
+    dashboard["max_hours"] = max(1, min(dashboard.get("max_hours", 24), int(days * 24 / 2)))
+    return config
+
+
+def slope_per_day(samples, key):
+    days = np.array([s["day"] for s in samples])
+    values = np.array([s[key] for s in samples], dtype=float)
+    if len(samples) < 3 or np.ptp(days) == 0:
+        return 0.0
+    return float(np.polyfit(days, values, 1)[0])
+
+
+def analyze(samples, settings, warmup_day=None):
+    """Trend summary over the post-warm-up samples, and the list of failures."""
+    if not samples:
+        return {}, ["no samples"]
+    if warmup_day is None:
+        warmup_day = max(s["day"] for s in samples) * settings["warmup_fraction"]
+    steady = [s for s in samples if s["day"] >= warmup_day] or samples[-1:]
+    span = steady[-1]["day"] - steady[0]["day"]
+    quarter = max(1, len(steady) // 4)
+    first_p99 = float(np.median([s["p99_ms"] for s in steady[:quarter]]))
+    last_p99 = float(np.median([s["p99_ms"] for s in steady[-quarter:]]))
+    summary = {
+        "ticks": samples[-1]["ticks"],
+        "rss_mb_start": steady[0]["rss_mb"],
+        "rss_mb_end": steady[-1]["rss_mb"],
+        "rss_mb_per_day": slope_per_day(steady, "rss_mb"),
+        "fd_growth": max(s["fds"] for s in steady) - steady[0]["fds"],
+        "p50_ms": float(np.median([s["p50_ms"] for s in steady])),
+        "p99_ms_first": first_p99,
+        "p99_ms_last": last_p99,
+    }
+    if steady[0]["traced_mb"] is not None:
+        summary["traced_mb_per_day"] = slope_per_day(steady, "traced_mb")
+
+    failures = []
+    if len(steady) < 4:
+        failures.append(f"only {len(steady)} samples after warm-up; run longer")
+    if (summary["rss_mb_per_day"] > settings["max_rss_growth_mb_per_day"]
+            and summary["rss_mb_per_day"] * span > settings["rss_noise_mb"]):
+        failures.append(f"RSS grows {summary['rss_mb_per_day']:.2f} MB/day")
+    traced = summary.get("traced_mb_per_day", 0)
+    if traced > settings["max_traced_growth_mb_per_day"] and traced * span > settings["traced_noise_mb"]:
+        failures.append(f"Python heap grows {traced:.2f} MB/day")
+    if summary["fd_growth"] > settings["max_fd_growth"]:
+        failures.append(f"{summary['fd_growth']} file descriptors leaked")
+    if (first_p99 > 0 and last_p99 / first_p99 > settings["max_p99_growth_ratio"]
+            and last_p99 - first_p99 > settings["p99_noise_ms"]):
+        failures.append(f"p99 latency went {first_p99:.2f} -> {last_p99:.2f} ms")
+    return summary, failures
+
+
+def run_loop(name, args, config, settings):
+    workdir = tempfile.mkdtemp(prefix=f"soak_{name}_")
+    try:
+        with open(os.path.join(workdir, "config.json"), "w") as f:
+            json.dump(soak_config(config, workdir, args.days), f)
+        out = os.path.join(workdir, "result.json")
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", name,
+               "--days", str(args.days), "--out", out]
+        cmd += ["--sample-every", str(args.sample_every)]
+        if args.no_tracemalloc:
+            cmd.append("--no-tracemalloc")
+        env = dict(os.environ, MOCK_GPIO="1", PYTHONPATH=HERE)
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        if not os.path.exists(out):
+            return {"error": proc.stderr[-2000:] or f"exit code {proc.returncode}",
+                    "failures": ["loop crashed"], "wall_sec": wall}
+        with open(out) as f:
+            result = json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary, failures = analyze(result["samples"], settings, result.get("warmup_day"))
+    if result["error"]:
+        failures.insert(0, f"loop raised {result['error']}")
+    result.update(summary=summary, failures=failures, wall_sec=wall)
+    return result
+
+
+def compare(report, old_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    print(f"\n📊 Compared with {old_path} ({old.get('created', '?')})")
+    for name, loop in report["loops"].items():
+        before = old.get("loops", {}).get(name, {}).get("summary")
+        now = loop.get("summary")
+        if not before or not now:
+            continue
+        for key in ("rss_mb_end", "rss_mb_per_day", "p50_ms", "p99_ms_last"):
+            print(f"  {name:18s} {key:15s} {before[key]:9.3f} -> {now[key]:9.3f}")
+
+
+def shortest_leak(settings, days):
+    """Smallest RSS growth (MB/day) a `days` long run can fail on."""
+    span = days * (1 - settings["warmup_fraction"])
+    return max(settings["max_rss_growth_mb_per_day"], settings["rss_noise_mb"] / span)
+
+
+def soak_settings(config):
+    """The SOAK section of config.json, with defaults."""
+    settings = config.get("SOAK", {})
+    return {
+        "report_dir": settings.get("report_dir", "data/soak"),
+        "days": settings.get("days", 3),
+        "sample_every_sec": settings.get("sample_every_sec", 3600),
+        "warmup_fraction": settings.get("warmup_fraction", 0.2),
+        "max_rss_growth_mb_per_day": settings.get("max_rss_growth_mb_per_day", 1.0),
+        "max_traced_growth_mb_per_day": settings.get("max_traced_growth_mb_per_day", 0.5),
+        "max_fd_growth": settings.get("max_fd_growth", 2),
+        "max_p99_growth_ratio": settings.get("max_p99_growth_ratio", 2.0),
+        "rss_noise_mb": settings.get("rss_noise_mb", 2.0),
+        "traced_noise_mb": settings.get("traced_noise_mb", 0.5),
+        "p99_noise_ms": settings.get("p99_noise_ms", 1.0),
+        "dashboard_step_sec": settings.get("dashboard_step_sec", 900),
+        "dashboard_sessions": settings.get("dashboard_sessions", 2),
+    }
+
+
+def main():
+    with open("config.json") as f:
+        config = json.load(f)
+    settings = soak_settings(config)
+
+    parser = argparse.ArgumentParser(description="Soak-test the always-on loops on simulated sensors")
+    parser.add_argument("--loops", default=",".join(LOOPS))
+    parser.add_argument("--days", type=float, default=settings["days"], help="simulated days per loop")
+    parser.add_argument("--sample-every", type=float,
+                        help="simulated seconds between samples (default: SOAK.sample_every_sec, "
+                             "or often enough for 20 samples on short runs)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="faster, but no allocator report")
+    parser.add_argument("--compare", help="earlier soak report to compare against")
+    parser.add_argument("--child", choices=LOOPS, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sample_every is None:
+        args.sample_every = min(settings["sample_every_sec"], args.days * 86400 / 20)
+    settings["sample_every_sec"] = args.sample_every
+    if args.child:
+        child(args, settings)
+        return
+
+    floor = shortest_leak(settings, args.days)
+    if floor > settings["max_rss_growth_mb_per_day"]:
+        print(f"⚠️  {args.days:g} days is too short for the RSS limit: growth under "
+              f"{floor:.2f} MB/day can't be told from noise")
+
+    report = {"created": _datetime.datetime.now().isoformat(timespec="seconds"),
+              "days": args.days, "settings": settings, "loops": {}}
+    for name in args.loops.split(","):
+        print(f"🧪 Soaking {name} for {args.days:g} simulated days...")
+        result = run_loop(name, args, config, settings)
+        report["loops"][name] = result
+        s = result.get("summary", {})
+        if s:
+            print(f"   {s['ticks']} ticks in {result['wall_sec']:.0f}s | RSS {s['rss_mb_start']:.1f} -> "
+                  f"{s['rss_mb_end']:.1f} MB ({s['rss_mb_per_day']:+.2f} MB/day) | "
+                  f"fds {s['fd_growth']:+d} | p50 {s['p50_ms']:.2f} ms | "
+                  f"p99 {s['p99_ms_first']:.2f} -> {s['p99_ms_last']:.2f} ms")
+        for failure in result["failures"]:
+            print(f"   ❌ {failure}")
+        if result.get("error") and not s:
+            print(result["error"])
+
+    os.makedirs(settings["report_dir"], exist_ok=True)
+    path = os.path.join(settings["report_dir"], f"soak_{report['created'].replace(':', '')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Report: {path}")
+    if args.compare:
+        compare(report, args.compare)
+
+    failed = [name for name, loop in report["loops"].items() if loop["failures"]]
+    if failed:
+        print(f"❌ Soak failed: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ No unbounded growth detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# soil_sensor.py
+# Edge-triggered soil moisture sensing for level2.py / level3.py.
+#
+# The digital soil sensor changes state a few times a day, so instead of
+# polling GPIO.input() every second we sleep on a GPIO edge interrupt
+# (add_event_detect), confirm the new level after a debounce delay, and
+# wake up for a heartbeat sample every `heartbeat_sec` so logs still show
+# the sensor is alive.
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Wall-clock time; the default for everything in level2/level3."""
+
+    def now(self):
+        return datetime.now()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, timeout=None):
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """Simulated time that only moves when someone sleeps or waits.
+
+    Scripted inputs are scheduled with call_at(); sleep()/wait() jump
+    straight to the next scheduled callback, so a day of soil cycles
+    runs in well under a second. Single-threaded by design.
+    """
+
+    def __init__(self, start=datetime(2025, 1, 1)):
+        self.start = start
+        self.t = 0.0
+        self._timers = []
+        self._seq = itertools.count()
+
+    def now(self):
+        return self.start + timedelta(seconds=self.t)
+
+    def monotonic(self):
+        return self.t
+
+    def call_at(self, when, fn):
+        heapq.heappush(self._timers, (when, next(self._seq), fn))
+
+    def _run_until(self, end, event=None):
+        while self._timers and self._timers[0][0] <= end:
+            when, _, fn = heapq.heappop(self._timers)
+            self.t = max(self.t, when)
+            fn()
+            if event is not None and event.is_set():
+                return True
+        if end == float("inf"):
+            raise RuntimeError("VirtualClock: waiting forever with nothing scheduled")
+        self.t = max(self.t, end)
+        return event is not None and event.is_set()
+
+    def sleep(self, seconds):
+        self._run_until(self.t + seconds)
+
+    def wait(self, event, timeout=None):
+        if event.is_set():
+            return True
+        end = float("inf") if timeout is None else self.t + timeout
+        return self._run_until(end, event)
+
+
+class SoilSensor:
+    def __init__(self, gpio, pin, debounce_ms=200, heartbeat_sec=300, clock=None):
+        self.gpio = gpio
+        self.clock = clock or SystemClock()
+        self.pin = pin
+        self.debounce = debounce_ms / 1000.0
+        self.heartbeat_sec = heartbeat_sec
+        self.edge = threading.Event()
+        self.value = None
+        self.next_heartbeat = None
+
+    @property
+    def state(self):
+        return "DRY" if self.value == 1 else "WET"
+
+    def start(self):
+        """Read the initial level and arm the edge interrupt."""
+        self.value = self.gpio.input(self.pin)
+        self.next_heartbeat = self.clock.monotonic() + self.heartbeat_sec
+        self.gpio.add_event_detect(self.pin, self.gpio.BOTH,
+                                   callback=self._on_edge,
+                                   bouncetime=max(1, int(self.debounce * 1000)))
+        return self.state, self.value
+
+    def stop(self):
+        self.gpio.remove_event_detect(self.pin)
+
+    def _on_edge(self, channel):
+        # Runs in the GPIO callback thread: just wake the main loop
+        self.edge.set()
+
+    def wait(self, timeout=None):
+        """Sleep until the debounced level changes, a heartbeat is due, or
+        `timeout` runs out. Returns "change", "heartbeat" or "timeout"."""
+        deadline = None if timeout is None else self.clock.monotonic() + timeout
+        while True:
+            now = self.clock.monotonic()
+            if now >= self.next_heartbeat:
+                while self.next_heartbeat <= now:
+                    self.next_heartbeat += self.heartbeat_sec
+                value = self.gpio.input(self.pin)
+                if value != self.value:  # an edge we never got an interrupt for
+                    self.value = value
+                    return "change"
+                return "heartbeat"
+            limit = self.next_heartbeat
+            if deadline is not None:
+                if now >= deadline:
+                    return "timeout"
+                limit = min(limit, deadline)
+
+            if not self.clock.wait(self.edge, limit - now):
+                continue
+            self.edge.clear()
+            # Contact bounce / noise: only trust the level once it has settled
+            self.clock.sleep(self.debounce)
+            value = self.gpio.input(self.pin)
+            if value != self.value:
+                self.value = value
+                return "change"
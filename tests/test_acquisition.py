@@ -0,0 +1,77 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import soak
+from acquisition import Acquisition, SensorReader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _stuck_after(n, *values):
+    """A read that answers n times, cycling through values, then never again."""
+    calls, stuck = [0], threading.Event()
+
+    def read(*args):
+        calls[0] += 1
+        if calls[0] > n:
+            stuck.wait()
+        return values[(calls[0] - 1) % len(values)]
+    return read
+
+
+def test_timed_out_read_is_the_old_value_and_not_fresh():
+    reader = SensorReader("pir", _stuck_after(1, 1))
+    acquisition = Acquisition({"pir": reader}, {"pir": 0.05})
+    first = acquisition.read()["pir"]
+    second = acquisition.read()["pir"]
+    assert first.fresh and not second.fresh
+    assert second.value == 1 and second.acquired_at == first.acquired_at
+
+
+# sensor_logger.py on the soak harness's virtual clock; the DHT stops
+# answering after DHT_READS reads (each a new value), the PIR after
+# PIR_READS. The PIR toggles, so the logger bursts to ticks shorter than
+# the DHT's min period.
+DHT_READS, PIR_READS = 5, 15
+DRIVER = f"""
+import runpy, sys
+sys.path.insert(0, {ROOT!r})
+import mock_gpio, soak
+soak.install_virtual_time(120, soak.Sampler(3600, trace=False), 0)
+import acquisition
+from tests.test_acquisition import _stuck_after
+acquisition._read_dht = _stuck_after({DHT_READS}, *[(21.0 + i, 40.0 + i) for i in range({DHT_READS})])
+mock_gpio.input = _stuck_after({PIR_READS}, 0, 1)
+try:
+    runpy.run_path({os.path.join(ROOT, "sensor_logger.py")!r}, run_name="__main__")
+except SystemExit:
+    pass
+"""
+
+
+def test_logger_never_logs_cached_values(tmp_path):
+    with open(os.path.join(ROOT, "config.json")) as f:
+        config = soak.soak_config(json.load(f), str(tmp_path), 1)
+    # A stuck sensor costs little real time
+    config["ACQUISITION"]["dht_timeout_sec"] = 0.05
+    assert config["SCHEDULER"]["min_interval_sec"] < config["ACQUISITION"]["dht_min_period_sec"]
+    with open(tmp_path / "config.json", "w") as f:
+        json.dump(config, f)
+    proc = subprocess.run([sys.executable, "-c", DRIVER], cwd=tmp_path, capture_output=True,
+                          text=True, timeout=120, env=dict(os.environ, MOCK_GPIO="1"))
+    assert proc.returncode == 0, proc.stderr
+
+    with open(config["LOGGING"]["log_file"]) as f:
+        rows = list(csv.DictReader(f))
+    # One row per PIR read: none once the PIR is stuck, so no repeated timestamps
+    assert len(rows) == PIR_READS
+    assert len({r["Timestamp"] for r in rows}) == len(rows)
+    # Each DHT read is logged once: not again when re-served inside its
+    # min period, nor after the DHT got stuck
+    logged = [r["Temperature"] for r in rows if r["Temperature"]]
+    assert sorted(logged) == [str(21.0 + i) for i in range(DHT_READS)]
+    assert all(r["Humidity"] == "" for r in rows if not r["Temperature"])
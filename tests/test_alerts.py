@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import mock_gpio
+from alerts import AlertActuator, TelegramNotifier
+from metrics import Metrics
+
+BUZZER, LED = 18, 23
+T0 = datetime(2025, 1, 1)
+
+
+class FakeTelegram:
+    """Local Bot API stand-in: records each sendMessage, answers after
+    `delay` seconds and only once `gate` is set."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.gate = threading.Event()
+        self.gate.set()
+        self.received = []   # (monotonic time, json body)
+        self.arrived = threading.Condition()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake.arrived:
+                    fake.received.append((time.monotonic(), body))
+                    fake.arrived.notify_all()
+                fake.gate.wait(5.0)
+                time.sleep(fake.delay)
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b'{"ok": true}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def wait_for(self, n, timeout=5.0):
+        with self.arrived:
+            assert self.arrived.wait_for(lambda: len(self.received) >= n, timeout)
+
+    def texts(self):
+        return [body["text"] for _, body in self.received]
+
+
+@pytest.fixture
+def telegram():
+    fake = FakeTelegram()
+    yield fake
+    fake.gate.set()
+    fake.server.shutdown()
+
+
+@pytest.fixture
+def gpio():
+    mock_gpio.reset()
+    mock_gpio.setmode(mock_gpio.BCM)
+    mock_gpio.setup([BUZZER, LED], mock_gpio.OUT)
+    yield mock_gpio
+    mock_gpio.reset()
+
+
+def _feed(actuator, preds):
+    return [actuator.update(pred, T0 + timedelta(seconds=2 * i), (24.0, 40.0, 1), -0.1)
+            for i, pred in enumerate(preds)]
+
+
+def test_hysteresis_needs_runs_to_raise_and_clear():
+    actuator = AlertActuator(mock_gpio, {}, raise_after=2, clear_after=3)
+    preds = [1, -1, 1, -1, -1, -1, 1, -1, 1, 1, 1, 1, -1]
+    events = _feed(actuator, preds)
+    # A lone anomaly doesn't raise, a lone normal tick doesn't clear
+    assert [(i, e) for i, e in enumerate(events) if e] == [(4, "raised"), (10, "cleared")]
+    assert not actuator.active
+
+
+def test_pins_are_written_only_on_transitions(gpio):
+    actuator = AlertActuator(gpio, {LED: []}, raise_after=2, clear_after=3)
+    _feed(actuator, [1] * 5 + [-1] * 10 + [1] * 10 + [-1] * 2)
+    actuator.close()
+    led = [value for _, pin, value in gpio.history if pin == LED]
+    # init low, raise, clear, raise again, close
+    assert led == [0, 1, 0, 1, 0]
+
+
+def test_full_queue_drops_and_counts(telegram):
+    metrics = Metrics("test")
+    notifier = TelegramNotifier("TOKEN", "42", telegram.url, min_interval=0, queue_size=2,
+                                metrics=metrics)
+    telegram.gate.clear()
+    notifier.notify("first")
+    telegram.wait_for(1)   # the sender is now stuck on this request
+    for i in range(10):
+        notifier.notify(f"msg {i}")
+    assert notifier.dropped == 8
+    assert metrics.counters["telegram_dropped"] == 8
+    telegram.gate.set()
+    notifier.close()
+    assert telegram.texts() == ["first", "msg 0\n\nmsg 1"]
+
+
+def test_messages_inside_min_interval_are_batched(telegram):
+    notifier = TelegramNotifier("TOKEN", "42", telegram.url, min_interval=0.5)
+    notifier.notify("a")
+    telegram.wait_for(1)
+    notifier.notify("b")
+    notifier.notify("c")
+    telegram.wait_for(2)
+    notifier.close()
+    assert telegram.texts() == ["a", "b\n\nc"]
+    (first, _), (second, _) = telegram.received
+    assert second - first >= 0.45
+    assert notifier.sent == 2
+
+
+def test_update_never_waits_on_a_slow_network(gpio, telegram):
+    telegram.delay = 0.3
+    notifier = TelegramNotifier("TOKEN", "42", telegram.url, min_interval=0.5)
+    actuator = AlertActuator(gpio, {BUZZER: [0.05, 0.15], LED: []}, raise_after=2,
+                             clear_after=3, notifier=notifier)
+    preds = [1, -1, -1, 1, 1, 1, -1, -1, 1, 1, 1, -1, -1, 1, 1, 1]
+    slowest = 0.0
+    for i, pred in enumerate(preds):
+        start = time.perf_counter()
+        actuator.update(pred, T0 + timedelta(seconds=2 * i), (24.0, 40.0, 1), -0.1)
+        slowest = max(slowest, time.perf_counter() - start)
+        time.sleep(0.02)
+    actuator.close()
+    # Six alerts, but the sender is still busy: they went out in batches
+    assert slowest < 0.05
+    assert telegram.texts()[0].startswith("🚨 Anomaly detected at 2025-01-01 00:00:04")
+    assert sum(text.count("\n\n") + 1 for text in telegram.texts()) == 6
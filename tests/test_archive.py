@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import archive
+from archive import compact, read_range
+from log_lock import log_lock
+
+HEADER = "Timestamp,Temperature,Humidity,Motion\n"
+
+
+def _row(ts):
+    return f"{ts:%Y-%m-%d %H:%M:%S},25.3,29.0,1\n"
+
+
+def _append(log_file, line):
+    # What sensor_logger does on every tick
+    with log_lock(log_file), open(log_file, "a") as f:
+        f.write(line)
+
+
+def _write_log(path, start, rows):
+    with open(path, "w") as f:
+        f.write(HEADER)
+        for i in range(rows):
+            f.write(_row(start + timedelta(seconds=2 * i)))
+
+
+def test_append_during_replace_is_not_lost(tmp_path, monkeypatch):
+    log_file = str(tmp_path / "sensor_log.csv")
+    archive_dir = str(tmp_path / "archive")
+    _write_log(log_file, datetime(2025, 1, 1, 23, 0), 100)
+    late = _row(datetime(2025, 1, 2, 0, 0))
+
+    # A logger tick lands right before compact() swaps the file in
+    real_replace = os.replace
+    writer = {}
+
+    def replace(src, dst):
+        if dst == log_file and "thread" not in writer:
+            writer["thread"] = threading.Thread(target=_append, args=(log_file, late))
+            writer["thread"].start()
+            time.sleep(0.2)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(archive.os, "replace", replace)
+    assert compact(log_file, archive_dir, today=date(2025, 1, 2)) == 100
+    writer["thread"].join()
+
+    with open(log_file) as f:
+        assert f.read() == HEADER + late
+    assert len(read_range(archive_dir, log_file)) == 101
+
+
+def test_concurrent_appends_survive_repeated_compaction(tmp_path):
+    log_file = str(tmp_path / "sensor_log.csv")
+    archive_dir = str(tmp_path / "archive")
+    start = datetime(2025, 1, 1)
+    _write_log(log_file, start, 5000)
+
+    # One row per simulated minute, so every compaction finds closed days
+    appended = []
+    stop = threading.Event()
+
+    def logger():
+        t = start + timedelta(days=1)
+        while not stop.is_set():
+            _append(log_file, _row(t))
+            appended.append(t)
+            t += timedelta(minutes=1)
+
+    thread = threading.Thread(target=logger)
+    thread.start()
+    try:
+        for _ in range(20):
+            compact(log_file, archive_dir, today=date(2100, 1, 1))
+    finally:
+        stop.set()
+        thread.join()
+    compact(log_file, archive_dir, today=date(2100, 1, 1))
+
+    df = read_range(archive_dir, log_file)
+    assert len(appended) > 0
+    assert len(df) == 5000 + len(appended)
+    assert df["Timestamp"].is_unique
+
+
+def test_read_recent_returns_archived_hours_only(tmp_path):
+    log_file = str(tmp_path / "sensor_log.csv")
+    archive_dir = str(tmp_path / "archive")
+    # Two and a half days at one row a minute; the two closed days get archived
+    _write_log(log_file, datetime(2025, 1, 1), 0)
+    for i in range(5 * 24 * 60 // 2):
+        _append(log_file, _row(datetime(2025, 1, 1) + timedelta(minutes=i)))
+    compact(log_file, archive_dir, today=date(2025, 1, 2))
+    compact(log_file, archive_dir, today=date(2025, 1, 3))
+
+    recent = archive.read_recent(archive_dir, log_file, 30)
+    assert recent["Timestamp"].iloc[-1] == datetime(2025, 1, 2, 23, 59)
+    assert recent["Timestamp"].iloc[0] == datetime(2025, 1, 1, 17, 59)
+    assert len(recent) == 30 * 60 + 1
+    assert archive.read_recent(archive_dir, str(tmp_path / "other.csv"), 30).empty
@@ -0,0 +1,89 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from archive import compact, read_range
+from feature_cache import FeatureCache
+from features import FEATURE_COLUMNS, compute_features
+
+WINDOW_SEC = 20
+HEADER = "Timestamp,Temperature,Humidity,Motion\n"
+
+
+def _rows(start, n, seed):
+    rng = np.random.default_rng(seed)
+    return "".join(
+        f"{start + timedelta(seconds=2 * i):%Y-%m-%d %H:%M:%S},"
+        f"{25 + rng.integers(0, 10) / 10:.1f},{29 + rng.integers(0, 3)}.0,{rng.integers(0, 2)}\n"
+        for i in range(n)
+    )
+
+
+def _expected(log_file, archive_dir):
+    # Full recompute over archive + complete CSV lines
+    df = read_range(archive_dir, log_file)
+    df = df[["Timestamp", "Temperature", "Humidity", "Motion"]].dropna().reset_index(drop=True)
+    return compute_features(df, WINDOW_SEC)[FEATURE_COLUMNS].to_numpy()
+
+
+def _setup(tmp_path):
+    log_file = str(tmp_path / "sensor_log.csv")
+    archive_dir = str(tmp_path / "archive")
+    cache = FeatureCache(str(tmp_path / "cache"), log_file, archive_dir, WINDOW_SEC)
+    return log_file, archive_dir, cache
+
+
+def _assert_matches(cache, log_file, archive_dir):
+    X, _ = cache.load()
+    expected = _expected(log_file, archive_dir)
+    assert X.shape == expected.shape
+    np.testing.assert_allclose(X, expected, rtol=0, atol=1e-7)
+
+
+def test_partial_line_is_left_for_the_next_run(tmp_path):
+    log_file, archive_dir, cache = _setup(tmp_path)
+    start = datetime(2025, 1, 1, 12)
+    with open(log_file, "w") as f:
+        f.write(HEADER + _rows(start, 200, 0) + "2025-01-01 12:06:40,25.3,2")
+    X, stats = cache.load()
+    assert stats["rebuilt"]
+
+    # The half-written row is completed, more rows follow
+    with open(log_file, "a") as f:
+        f.write("9.0,1\n" + _rows(start + timedelta(seconds=402), 50, 1))
+    X, stats = cache.load()
+    assert not stats["rebuilt"]
+    assert len(pd.read_csv(log_file)) == 251
+    _assert_matches(cache, log_file, archive_dir)
+
+
+def test_partial_line_after_compaction(tmp_path):
+    log_file, archive_dir, cache = _setup(tmp_path)
+    day1, day2 = datetime(2025, 1, 1, 23, 50), datetime(2025, 1, 2, 0, 0)
+    with open(log_file, "w") as f:
+        f.write(HEADER + _rows(day1, 300, 2))   # runs past midnight
+    cache.load()
+
+    # More rows and a half-written one, then day 1 is compacted away
+    with open(log_file, "a") as f:
+        f.write(_rows(day2 + timedelta(seconds=600), 100, 3) + "2025-01-02 00:20:00,25.3,2")
+    compact(log_file, archive_dir, today=date(2025, 1, 2))
+    X, stats = cache.load()
+    assert not stats["rebuilt"]
+    _assert_matches(cache, log_file, archive_dir)
+
+    # The row is completed and appended to: the next run must not start mid-line
+    with open(log_file, "a") as f:
+        f.write("9.0,1\n" + _rows(day2 + timedelta(seconds=1202), 50, 4))
+    X, stats = cache.load()
+    assert not stats["rebuilt"]
+    _assert_matches(cache, log_file, archive_dir)
+
+
+def test_header_only_log(tmp_path):
+    log_file, archive_dir, cache = _setup(tmp_path)
+    with open(log_file, "w") as f:
+        f.write(HEADER)
+    X, stats = cache.load()
+    assert X.shape == (0, len(FEATURE_COLUMNS))
@@ -0,0 +1,88 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, RAW_COLUMNS, IncrementalFeatures, compute_features
+
+WINDOW_SEC = 20
+SENSOR_LOG = os.path.join(os.path.dirname(__file__), "..", "data", "sensor_log.csv")
+# Measured error is ~6e-8 (pandas' rolling variance residue on flat windows)
+TOLERANCE = 1e-7
+
+
+def _log(offsets, seed=0):
+    """A sensor log at the given second offsets, quantized like the DHT11."""
+    rng = np.random.default_rng(seed)
+    t0 = datetime(2025, 3, 1, 5, 30)
+    n = len(offsets)
+    return pd.DataFrame({
+        "Timestamp": [(t0 + timedelta(seconds=s)).strftime("%Y-%m-%d %H:%M:%S") for s in offsets],
+        "Temperature": np.round(25.3 + np.cumsum(rng.normal(0, 0.05, n)), 1),
+        "Humidity": np.round(29 + np.cumsum(rng.normal(0, 0.3, n))),
+        "Motion": rng.integers(0, 2, n),
+    })
+
+
+def _stream(df):
+    inc = IncrementalFeatures(WINDOW_SEC)
+    rows, index = [], []
+    for i, ts, temp, hum, motion in df[["Timestamp"] + RAW_COLUMNS].itertuples(name=None):
+        feats = inc.update(ts, temp, hum, motion)
+        if feats is not None:
+            rows.append(feats)
+            index.append(i)
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS, index=index)
+
+
+def _assert_parity(df):
+    batch = compute_features(df, WINDOW_SEC)
+    stream = _stream(df)
+    assert list(batch.index) == list(stream.index)
+    assert len(batch) > 0
+    np.testing.assert_allclose(stream.to_numpy(), batch.to_numpy(), rtol=0, atol=TOLERANCE)
+
+
+def test_parity_with_window_eviction():
+    # 2 s ticks for 10 minutes: every window evicts old samples
+    _assert_parity(_log(range(0, 600, 2)))
+
+
+def test_parity_across_gap_longer_than_window():
+    # The window empties completely across the gap and has to warm up again
+    offsets = list(range(0, 100, 2)) + list(range(100 + 3 * WINDOW_SEC, 300, 2))
+    _assert_parity(_log(offsets, seed=1))
+
+
+def test_parity_with_gap_of_exactly_window_sec():
+    offsets = list(range(0, 60, 2)) + [58 + WINDOW_SEC] + list(range(80, 160, 2))
+    _assert_parity(_log(offsets, seed=2))
+
+
+def test_parity_with_duplicate_timestamps():
+    # Bursts at 1 s resolution log several rows in the same second
+    offsets = [0, 1, 1, 2, 2, 2, 3, 5, 5, 7, 8, 8, 10, 12, 12, 13, 15, 15, 15, 18,
+               20, 21, 21, 24, 25, 25, 28, 30, 30, 33, 36, 40, 40, 41, 45, 45, 50]
+    _assert_parity(_log(offsets, seed=3))
+
+
+def test_parity_with_flat_readings():
+    df = _log(range(0, 200, 2))
+    df["Temperature"] = 25.3
+    df["Humidity"] = 29.0
+    _assert_parity(df)
+
+
+@pytest.mark.skipif(not os.path.exists(SENSOR_LOG), reason="no recorded sensor log")
+def test_parity_on_recorded_log():
+    _assert_parity(pd.read_csv(SENSOR_LOG).dropna().reset_index(drop=True))
+
+
+def test_warmup_returns_none():
+    inc = IncrementalFeatures(WINDOW_SEC)
+    assert inc.update("2025-03-01 05:30:00", 25.3, 29, 1) is None
+    angle = 2 * np.pi * (5 * 3600 + 30 * 60 + 2) / 86400
+    assert inc.update("2025-03-01 05:30:02", 25.3, 29, 1) == pytest.approx(
+        [25.3, 29.0, 1.0, 0.0, 0.0, 0.0, 0.0, np.sin(angle), np.cos(angle)])
@@ -0,0 +1,24 @@
+import level3_sim
+from level3_sim import SCENARIOS, SoilModel, simulate
+
+
+def _run(scenario, days=3):
+    return simulate(days, lambda clock: SoilModel(clock, **SCENARIOS[scenario]))
+
+
+def test_noisy_sensor_chatters_without_extra_watering():
+    normal, noisy = _run("normal"), _run("noisy")
+    assert normal["sensor_glitches"] == 0
+    assert noisy["sensor_glitches"] > 0
+    # Glitches longer than the debounce reach the log ...
+    assert noisy["log_rows"] > normal["log_rows"]
+    # ... but DRY_COUNT and the cooldown keep them away from the pump
+    assert noisy["waterings"] == normal["waterings"]
+    assert noisy["cooldown_violations"] == 0
+
+
+def test_glitches_shorter_than_the_debounce_are_filtered(monkeypatch):
+    monkeypatch.setattr(level3_sim, "GLITCH_SEC", (0.01, 0.05))
+    normal, noisy = _run("normal"), _run("noisy")
+    assert noisy["sensor_glitches"] > 0
+    assert noisy["log_rows"] == normal["log_rows"]
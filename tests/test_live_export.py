@@ -0,0 +1,139 @@
+import json
+import re
+
+from datetime import date
+
+import plotly.graph_objects as go
+
+from archive import compact
+from live_export import LiveHtmlExporter, num
+
+HEADER = "Timestamp,Temperature\n"
+
+
+def _exporter(tmp_path, max_chunks, **kwargs):
+    csv_path = tmp_path / "log.csv"
+    csv_path.write_text(HEADER)
+    pages = []   # rows built into each page write
+
+    def build_figure(df):
+        pages.append(len(df))
+        return go.Figure(go.Scatter(x=df["Timestamp"], y=df["Temperature"]))
+
+    def new_points(rows):
+        return [([r["Timestamp"] for r in rows], [num(r["Temperature"]) for r in rows])]
+
+    exporter = LiveHtmlExporter(str(csv_path), str(tmp_path / "plot.html"), build_figure,
+                                new_points, max_chunks=max_chunks, **kwargs)
+    return csv_path, exporter, pages
+
+
+def _append(csv_path, i):
+    with open(csv_path, "a") as f:
+        f.write(f"2025-01-01 00:{i // 60:02d}:{i % 60:02d},{20 + i / 10}\n")
+
+
+def _load(exporter):
+    """What a freshly opened page starts from: (generation, lastSeq)."""
+    with open(exporter.html_path) as f:
+        html = f.read()
+    generation, last_seq = re.search(r"var generation = (.*?), lastSeq = (\d+);", html).groups()
+    return json.loads(generation), int(last_seq)
+
+
+def _poll(exporter, page):
+    """One livePlotUpdate() as in the page script: (points applied, reload?)."""
+    generation, last_seq = page
+    with open(exporter.data_path) as f:
+        payload = json.loads(re.fullmatch(r"window\.livePlotUpdate\((.*)\);", f.read()).group(1))
+    if payload["generation"] != generation:
+        return 0, True
+    fresh = [c for c in payload["chunks"] if c["seq"] > last_seq]
+    if fresh and fresh[0]["seq"] != last_seq + 1:
+        return 0, True
+    page[1] = fresh[-1]["seq"] if fresh else last_seq
+    return sum(len(x) for c in fresh for x in c["x"]), False
+
+
+def test_pages_opened_late_do_not_reload_forever(tmp_path):
+    max_chunks = 5
+    csv_path, exporter, pages = _exporter(tmp_path, max_chunks)
+    _append(csv_path, 0)
+    assert exporter.refresh() == "page"
+
+    open_page = list(_load(exporter))
+    shown = pages[-1]
+    for i in range(1, 4 * max_chunks):
+        _append(csv_path, i)
+        assert exporter.refresh() in ("data", "page")
+
+        # The page that stayed open follows along without gaps
+        points, reload = _poll(exporter, open_page)
+        assert not reload
+        shown += points
+
+        # A page opened now catches up from the payload without reloading
+        new_page = list(_load(exporter))
+        points, reload = _poll(exporter, new_page)
+        assert not reload
+        assert pages[-1] + points == i + 1
+
+    assert shown == 4 * max_chunks
+    # The page is rewritten about once per max_chunks refreshes, not every time
+    assert len(pages) <= 1 + 4 * max_chunks // (max_chunks - 1)
+
+
+def test_payload_contract_after_eviction(tmp_path):
+    max_chunks = 3
+    csv_path, exporter, _ = _exporter(tmp_path, max_chunks)
+    _append(csv_path, 0)
+    exporter.refresh()
+    for i in range(1, 10):
+        _append(csv_path, i)
+        exporter.refresh()
+        _, page_seq = _load(exporter)
+        seqs = [c["seq"] for c in exporter.chunks]
+        assert len(seqs) <= max_chunks
+        assert seqs == list(range(seqs[0], seqs[-1] + 1))
+        # Every chunk after the page's own is still in the payload
+        assert seqs[0] <= page_seq + 1
+        assert seqs[-1] == exporter.seq
+
+
+def test_unchanged_csv_writes_nothing(tmp_path):
+    csv_path, exporter, pages = _exporter(tmp_path, 5)
+    _append(csv_path, 0)
+    exporter.refresh()
+    assert exporter.refresh() == "unchanged"
+    assert len(pages) == 1
+
+
+def test_failed_refresh_rebuilds_next_time(tmp_path):
+    csv_path, exporter, pages = _exporter(tmp_path, 5)
+    _append(csv_path, 0)
+    exporter.refresh()
+    _append(csv_path, 1)
+    broken = exporter.new_points
+    exporter.new_points = lambda rows: 1 / 0
+    try:
+        exporter.refresh()
+    except ZeroDivisionError:
+        pass
+    exporter.new_points = broken
+    assert exporter.refresh() == "page"
+    assert pages[-1] == 2
+
+
+def test_page_keeps_archived_rows_after_compaction(tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    csv_path, exporter, pages = _exporter(tmp_path, 5, archive_dir=archive_dir, history_hours=24)
+    for i in range(10):
+        _append(csv_path, i)
+    exporter.refresh()
+    # The nightly compaction moves every row into the archive
+    compact(str(csv_path), archive_dir, today=date(2025, 1, 2))
+    assert exporter.refresh() == "page"
+    assert pages[-1] == 10
+    _append(csv_path, 10)
+    assert exporter.refresh() == "data"
+    assert num("") is None and num(float("nan")) is None
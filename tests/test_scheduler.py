@@ -0,0 +1,90 @@
+from scheduler import AdaptiveScheduler, motion_started, readings_changed
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.t += seconds
+
+
+def _scheduler(clock, **kwargs):
+    settings = dict(min_interval=1, max_interval=10, burst_hold=30, stable_ticks=3, backoff=2)
+    settings.update(kwargs)
+    return AdaptiveScheduler(2, clock=clock, sleep=clock.sleep, **settings)
+
+
+def test_ticks_fire_on_deadlines_regardless_of_work_time():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    fired = []
+    for work in (0.3, 1.5, 0.0, 0.7):
+        assert scheduler.wait() == 0
+        fired.append(clock.t)
+        clock.t += work
+    assert fired == [0, 2, 4, 6]
+
+
+def test_overrun_skips_the_missed_slots():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    scheduler.wait()
+    clock.t += 5.5  # deadlines at 2 and 4 have passed: fire 4 late, skip 2
+    assert scheduler.wait() == 1
+    assert scheduler.missed_total == 1
+    assert abs(scheduler.last_lateness - 1.5) < 1e-9
+    assert scheduler.next_deadline == 6  # the next slot, not a catch-up burst
+    assert scheduler.wait() == 0 and clock.t == 6
+
+
+def test_burst_holds_the_fast_rate_then_returns_to_base():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    scheduler.wait()
+    scheduler.burst()
+    assert scheduler.interval == 1
+    clock.t = 29
+    scheduler.update(False)
+    assert scheduler.interval == 1
+    clock.t = 31
+    scheduler.update(True)
+    assert scheduler.interval == 2
+
+
+def test_stable_readings_back_off_to_max_interval():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    intervals = []
+    for _ in range(12):
+        scheduler.wait()
+        scheduler.update(False)
+        intervals.append(scheduler.interval)
+    assert intervals == [2, 2, 4, 4, 4, 8, 8, 8, 10, 10, 10, 10]
+    scheduler.update(True)
+    assert scheduler.interval == 2
+
+
+def test_only_a_rising_edge_counts_as_motion():
+    levels = [None, 1, 1, 1, 0, 1, 1]
+    edges = [motion_started(prev, motion) for prev, motion in zip(levels, levels[1:])]
+    assert edges == [False, False, False, False, True, False]
+
+
+def test_a_steady_high_pir_lets_the_loop_back_off():
+    # The loops' pacing on the logged data, where Motion is always 1
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    last_motion = None
+    for _ in range(20):
+        scheduler.wait()
+        if motion_started(last_motion, 1):
+            scheduler.burst()
+        scheduler.update(readings_changed((20.0, 40.0), 20.0, 40.0, {}))
+        last_motion = 1
+    assert scheduler.interval == 10
@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from scoring_service import HELLO, LocalScorer, ScoringClient, ScoringServer
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "isolation_forest.pkl")
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="no trained model")
+
+
+@pytest.fixture
+def sock_dir():
+    # Unix socket paths are limited to ~100 bytes, pytest's tmp_path can be longer
+    path = tempfile.mkdtemp(prefix="hsu")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture(scope="module")
+def local():
+    return LocalScorer(MODEL_PATH)
+
+
+def _start_server(scorer, path, batch_window_ms=2.0):
+    server = ScoringServer(scorer, path, batch_window_ms=batch_window_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for _ in range(200):
+        if os.path.exists(path):
+            break
+        threading.Event().wait(0.01)
+    return server
+
+
+class FakeServer:
+    """Greets like the daemon, then hangs or hangs up on every request."""
+
+    def __init__(self, path, scorer, mode):
+        self.path = path
+        self.mode = mode
+        self.hello = json.dumps({"features": scorer.features, "feature_version": scorer.feature_version,
+                                 "window_sec": scorer.window_sec}).encode()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(8)
+        self.conns = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.conns.append(conn)
+            conn.sendall(HELLO.pack(len(self.hello)) + self.hello)
+            if self.mode == "close":
+                conn.recv(1)
+                conn.close()
+
+    def stop(self):
+        self.listener.close()
+        os.remove(self.path)
+        for conn in self.conns:
+            conn.close()
+
+
+def _rows(local, n=3, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, len(local.features)))
+
+
+def test_scores_match_local(sock_dir, local):
+    path = os.path.join(sock_dir, "s.sock")
+    _start_server(local, path)
+    client = ScoringClient(path)
+    X = _rows(local)
+    np.testing.assert_allclose(client.decision_function(X), local.decision_function(X))
+    client.close()
+
+
+def test_bad_request_fails_alone(sock_dir, local):
+    path = os.path.join(sock_dir, "s.sock")
+    # A long window so both requests land in the same batch
+    _start_server(local, path, batch_window_ms=500)
+    good_client, bad_client = ScoringClient(path, timeout=2.0), ScoringClient(path, timeout=2.0)
+    good, bad = _rows(local), _rows(local)
+    bad[1, 0] = np.inf  # rejected by the model
+    results = {}
+
+    def call(name, client, X):
+        try:
+            results[name] = client.decision_function(X)
+        except ValueError as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=call, args=("good", good_client, good)),
+               threading.Thread(target=call, args=("bad", bad_client, bad))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert isinstance(results["bad"], ValueError)
+    np.testing.assert_allclose(results["good"], local.decision_function(good))
+    # The connection that sent the bad rows is still usable
+    np.testing.assert_allclose(bad_client.decision_function(good), local.decision_function(good))
+
+
+@pytest.mark.parametrize("mode", ["hang", "close"])
+def test_client_falls_back_to_local_scoring(sock_dir, local, mode):
+    path = os.path.join(sock_dir, "s.sock")
+    fake = FakeServer(path, local, mode)
+    client = ScoringClient(path, timeout=0.2, fallback=lambda: local, retry_sec=60)
+    X = _rows(local)
+    np.testing.assert_allclose(client.decision_function(X), local.decision_function(X))
+    assert client.local is local
+    assert client.sock is None
+    fake.stop()
+
+
+def test_client_returns_to_the_service_after_a_restart(sock_dir, local):
+    path = os.path.join(sock_dir, "s.sock")
+    fake = FakeServer(path, local, "close")
+    client = ScoringClient(path, timeout=0.2, fallback=lambda: local, retry_sec=0)
+    X = _rows(local)
+    client.decision_function(X)          # served locally
+    fake.stop()
+
+    _start_server(local, path)           # the daemon comes back
+    np.testing.assert_allclose(client.decision_function(X), local.decision_function(X))
+    assert client.sock is not None
+    client.close()
+
+
+def test_hung_service_never_stalls_a_tick_for_long(sock_dir, local):
+    path = os.path.join(sock_dir, "s.sock")
+    fake = FakeServer(path, local, "hang")
+    timeout = 0.1
+    client = ScoringClient(path, timeout=timeout, fallback=lambda: local, retry_sec=0.3)
+    X = _rows(local)
+    stalls = []
+    end = time.monotonic() + 1.5
+    while time.monotonic() < end:
+        start = time.monotonic()
+        client.decision_function(X)
+        stalls.append(time.monotonic() - start)
+        time.sleep(0.05)
+    fake.stop()
+    # The first failure tries twice; every later retry probes once
+    assert stalls[0] < 2 * timeout + 0.1
+    assert max(stalls[1:]) < timeout + 0.1
+    assert sum(s > timeout / 2 for s in stalls[1:]) >= 2   # it did keep probing
+
+
+def test_without_fallback_errors_surface(sock_dir, local):
+    path = os.path.join(sock_dir, "s.sock")
+    fake = FakeServer(path, local, "hang")
+    client = ScoringClient(path, timeout=0.2)
+    with pytest.raises(OSError):
+        client.decision_function(_rows(local))
+    fake.stop()
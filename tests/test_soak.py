@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import soak
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTINGS = soak.soak_settings({})
+
+
+def _samples(days, rss, n=20):
+    """n evenly spaced samples over `days`, with RSS from rss(day)."""
+    return [{"day": days * i / (n - 1), "ticks": i, "rss_mb": rss(days * i / (n - 1)),
+             "traced_mb": 50.0, "fds": 10, "p50_ms": 1.0, "p99_ms": 2.0, "max_ms": 3.0}
+            for i in range(n)]
+
+
+def test_short_run_noise_is_not_a_leak():
+    # 0.1 MB of RSS over a tenth of a day extrapolates past the daily limit
+    summary, failures = soak.analyze(_samples(0.1, lambda day: 200 + day), SETTINGS)
+    assert summary["rss_mb_per_day"] > SETTINGS["max_rss_growth_mb_per_day"]
+    assert failures == []
+    assert soak.shortest_leak(SETTINGS, 0.1) > SETTINGS["max_rss_growth_mb_per_day"]
+
+
+def test_default_run_applies_the_daily_limit():
+    days = SETTINGS["days"]
+    assert soak.shortest_leak(SETTINGS, days) == SETTINGS["max_rss_growth_mb_per_day"]
+    summary, failures = soak.analyze(_samples(days, lambda day: 200 + 1.2 * day), SETTINGS)
+    assert failures == [f"RSS grows {summary['rss_mb_per_day']:.2f} MB/day"]
+    assert soak.analyze(_samples(days, lambda day: 200 + 0.8 * day), SETTINGS)[1] == []
+
+
+def test_steady_growth_is_a_leak():
+    summary, failures = soak.analyze(_samples(2, lambda day: 200 + 5 * day), SETTINGS)
+    assert failures == [f"RSS grows {summary['rss_mb_per_day']:.2f} MB/day"]
+
+
+def test_warm_up_growth_is_ignored():
+    # A buffer filling for the first half of the run, then flat
+    samples = _samples(1, lambda day: 200 + 50 * min(day, 0.5))
+    assert soak.analyze(samples, SETTINGS)[1] != []
+    assert soak.analyze(samples, SETTINGS, warmup_day=0.5)[1] == []
+
+
+def test_too_few_samples_fail():
+    failures = soak.analyze(_samples(1, lambda day: 200, n=3), SETTINGS)[1]
+    assert any("run longer" in f for f in failures)
+
+
+# The dashboard needs its (one hour) buffer filled plus a few refreshes
+@pytest.mark.parametrize("loops, days", [
+    ("sensor_logger,realtime_detector,level3", 0.01),
+    ("dashboard", 0.1),
+])
+def test_smoke(tmp_path, loops, days):
+    shutil.copy(os.path.join(ROOT, "config.json"), tmp_path)
+    proc = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "soak.py"), "--loops", loops,
+         "--days", str(days), "--no-tracemalloc"],
+        cwd=tmp_path, capture_output=True, text=True, timeout=300,
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    [report] = (tmp_path / "data" / "soak").iterdir()
+    with open(report) as f:
+        results = json.load(f)["loops"]
+    assert sorted(results) == sorted(loops.split(","))
+    for result in results.values():
+        assert result["failures"] == [] and result["summary"]["ticks"] > 0
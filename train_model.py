@@ -1,33 +1,51 @@
-import numpy as np
-import pandas as pd
+import argparse
 import os
 import json
 import joblib
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
+from archive import list_segments
+from feature_cache import FeatureCache
+from features import FEATURE_COLUMNS, FEATURE_VERSION, window_seconds
 
 # Load config
 with open("config.json") as f:
     CONFIG = json.load(f)
 
 LOG_FILE = CONFIG["LOGGING"]["log_file"]
+ARCHIVE_DIR = CONFIG["LOGGING"]["archive_dir"]
 MODEL_PATH = CONFIG["MODEL"]["model_path"]
-ROLLING = CONFIG["MODEL"]["rolling_window"]
+CACHE_DIR = CONFIG["MODEL"].get("feature_cache_dir", "models/feature_cache")
 CONTAM = CONFIG["MODEL"]["contamination"]
+WINDOW_SEC = window_seconds(CONFIG)  # time-based, so uneven sampling keeps its meaning
+BUDGET = CONFIG["MODEL"].get("budget", {})
 
-# Load data
-if not os.path.exists(LOG_FILE):
-    raise FileNotFoundError(f"Sensor log file not found: {LOG_FILE}")
+# --budget also writes the smallest model that fits a per-prediction
+# latency / artifact size budget (see model_budget.py)
+parser = argparse.ArgumentParser(description="Train the Isolation Forest anomaly model")
+parser.add_argument("--budget", action="store_true", help="also search for a budgeted model")
+parser.add_argument("--latency-ms", type=float, default=BUDGET.get("latency_ms", 5.0))
+parser.add_argument("--memory-kb", type=float, default=BUDGET.get("memory_kb", 512))
+parser.add_argument("--min-agreement", type=float, default=BUDGET.get("min_agreement", 0.9))
+parser.add_argument("--slowdown", type=float, default=BUDGET.get("slowdown", 1.0),
+                    help="how many times slower the target board is than this machine")
+args = parser.parse_args()
 
-df = pd.read_csv(LOG_FILE)
-df.dropna(inplace=True)  # Drop rows with missing values
+# Load data: archived days (see archive.py) followed by the live CSV
+if not os.path.exists(LOG_FILE) and not list_segments(ARCHIVE_DIR, LOG_FILE):
+    raise FileNotFoundError(f"Sensor log file not found: {LOG_FILE}")
 
-# Apply rolling average
-features = df[["Temperature", "Humidity", "Motion"]].rolling(ROLLING).mean().dropna()
+# Rolling-window features (same pipeline as the live detector), cached on
+# disk so only rows logged since the last run get recomputed
+X, stats = FeatureCache(CACHE_DIR, LOG_FILE, ARCHIVE_DIR, WINDOW_SEC).load()
+if stats["rebuilt"]:
+    print(f"🧮 Feature cache rebuilt: {stats['new_rows']} rows")
+else:
+    print(f"🧮 Feature cache: {stats['cached_rows']} cached rows + {stats['new_rows']} new")
 
-# Standardize
+# Standardize (fit on a plain array so the detector can pass lists per tick)
 scaler = StandardScaler()
-X_scaled = scaler.fit_transform(features)
+X_scaled = scaler.fit_transform(X)
 
 # Train Isolation Forest model
 model = IsolationForest(contamination=CONTAM, random_state=42)
@@ -35,7 +53,38 @@ model.fit(X_scaled)
 
 # Save model and scaler
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)  # Ensure model directory exists
-joblib.dump({"model": model, "scaler": scaler}, MODEL_PATH)
+model_data = {
+    "model": model,
+    "scaler": scaler,
+    "features": FEATURE_COLUMNS,
+    "feature_version": FEATURE_VERSION,
+    "window_sec": WINDOW_SEC,
+}
+joblib.dump(model_data, MODEL_PATH)
 
 print("✅ Model trained and saved to:", MODEL_PATH)
 print(f"Trained on {len(X_scaled)} records.")
+
+if args.budget:
+    from model_budget import search
+
+    budget_path = BUDGET.get("model_path", "models/isolation_forest_budget.pkl")
+    report_path = BUDGET.get("report_path", "models/budget_report.json")
+    budget_data, report = search(X, scaler, model_data, CONTAM, args.latency_ms,
+                                 args.memory_kb, args.min_agreement, args.slowdown)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    full = report["full_model"]
+    print(f"📏 Full model: {full['n_estimators']} trees, {full['latency_ms']:.2f} ms/prediction, "
+          f"{full['size_kb']:.0f} KB")
+    if budget_data is None:
+        print(f"⚠️ No candidate fits {args.latency_ms} ms / {args.memory_kb} KB "
+              f"at {args.min_agreement:.0%} agreement; see {report_path}")
+    else:
+        chosen = report["chosen"]
+        joblib.dump(budget_data, budget_path)
+        print(f"✅ Budget model ({chosen['n_estimators']} trees, max_samples {chosen['max_samples']}): "
+              f"{chosen['latency_ms']:.2f} ms/prediction, {chosen['size_kb']:.0f} KB, "
+              f"{chosen['agreement']:.1%} agreement -> {budget_path}")
+        print(f"📄 Trade-off report: {report_path}")
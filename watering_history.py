@@ -0,0 +1,250 @@
+# watering_history.py
+# Paged reads of level3's watering_log.csv through a sparse offset index.
+#
+# The log only ever grows, so we keep a sidecar <log>.idx with one line per
+# block of BLOCK_ROWS rows: byte offset, first timestamp, row count, DRY
+# rows and pump events. A page is a binary search over the blocks plus a
+# reverse seek into one or two of them, and the chart series is built from
+# the per-block counts, so neither gets slower as the log grows.
+#
+#   python watering_history.py bench [rows]
+import bisect
+import csv
+import io
+import os
+import threading
+from datetime import datetime
+
+BLOCK_ROWS = 1024
+ROW_SERIES_LIMIT = 4096   # below this many rows, series() reads the rows
+IDX_HEADER = "offset,end,first_ts,rows,dry,pumps\n"
+
+
+def _parse(line):
+    """(timestamp, state, raw_value, action) from one log line."""
+    ts, state, val, action = next(csv.reader([line]))
+    return datetime.fromisoformat(ts), state, val, action
+
+
+class LogIndex:
+    def __init__(self, log_path, block_rows=BLOCK_ROWS):
+        self.log_path = log_path
+        self.idx_path = log_path + ".idx"
+        self.block_rows = block_rows
+        self.lock = threading.Lock()
+        self.blocks = []       # [offset, first_ts, rows, dry, pumps, end], oldest first
+        self.offsets = []      # per block, for bisect
+        self.starts = []
+        self.data_start = 0    # byte offset of the first data row
+        self.indexed_end = 0   # bytes covered by complete lines
+        self.size = 0
+        self._load()
+
+    # ---------- index maintenance ----------
+
+    def _load(self):
+        if not os.path.exists(self.idx_path):
+            return
+        with open(self.idx_path) as f:
+            f.readline()
+            for line in f:
+                offset, end, ts, rows, dry, pumps = line.rstrip("\n").split(",")
+                self._add([int(offset), datetime.fromisoformat(ts), int(rows), int(dry), int(pumps), int(end)])
+        if self.blocks and not self._matches(self.blocks[-1]):
+            self._reset()  # index belongs to an older log
+        elif self.blocks:
+            self.indexed_end = self.blocks[-1][5]
+
+    def _matches(self, block):
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) < block[5]:
+            return False
+        with open(self.log_path, "rb") as f:
+            f.seek(block[0])
+            line = f.readline().decode(errors="replace")
+        try:
+            return _parse(line)[0] == block[1]
+        except (ValueError, StopIteration):
+            return False
+
+    def _add(self, block):
+        self.blocks.append(block)
+        self.offsets.append(block[0])
+        self.starts.append(block[1])
+
+    def _reset(self):
+        self.blocks, self.offsets, self.starts = [], [], []
+        self.data_start = self.indexed_end = self.size = 0
+        if os.path.exists(self.idx_path):
+            os.remove(self.idx_path)
+
+    def refresh(self):
+        """Index complete lines appended since the last call."""
+        with self.lock:
+            size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+            if size < self.size:
+                self._reset()  # log was truncated or replaced
+            if size == self.size:
+                return
+            with open(self.log_path, "rb") as f:
+                if not self.data_start:
+                    f.readline()
+                    self.data_start = f.tell()
+                # Re-read the open (partial) last block, then any new lines
+                last = self.blocks[-1] if self.blocks else None
+                if last is not None and last[2] < self.block_rows:
+                    self.blocks.pop()
+                    self.offsets.pop()
+                    self.starts.pop()
+                    start = last[0]
+                else:
+                    start = max(self.indexed_end, self.data_start)
+                f.seek(start)
+                data = f.read(size - start)
+            end = data.rfind(b"\n") + 1
+            pos, block = start, None
+            for raw in data[:end].splitlines(keepends=True):
+                if not raw.strip():
+                    pos += len(raw)
+                    continue
+                ts, state, _, action = _parse(raw.decode())
+                if block is None or block[2] >= self.block_rows:
+                    block = [pos, ts, 0, 0, 0, pos]
+                    self._add(block)
+                pos += len(raw)
+                block[2] += 1
+                block[3] += state == "DRY"
+                block[4] += action == "WATERED"
+                block[5] = pos
+            self.indexed_end = start + end
+            self.size = size
+            self._save()
+
+    def _save(self):
+        # Only whole blocks are written; the open one is rebuilt on startup
+        tmp = self.idx_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(IDX_HEADER)
+            for offset, ts, rows, dry, pumps, end in self.blocks:
+                if rows >= self.block_rows:
+                    f.write(f"{offset},{end},{ts.isoformat()},{rows},{dry},{pumps}\n")
+        os.replace(tmp, self.idx_path)
+
+    # ---------- queries ----------
+
+    def _read_block(self, i, stop=None):
+        """Rows of block i as (offset, ts, state, raw_value, action), up to byte `stop`."""
+        offset, end = self.blocks[i][0], self.blocks[i][5]
+        if stop is not None:
+            end = min(end, stop)
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(end - offset)
+        rows, pos = [], offset
+        for raw in data.splitlines(keepends=True):
+            if raw.strip():
+                rows.append((pos,) + _parse(raw.decode()))
+            pos += len(raw)
+        return rows
+
+    def page(self, start=None, end=None, limit=100, cursor=None):
+        """Newest-first rows in [start, end]; pass the returned cursor for the next page."""
+        self.refresh()
+        with self.lock:
+            if not self.blocks:
+                return [], None
+            stop = int(cursor) if cursor is not None else None
+            if stop is not None:
+                i = bisect.bisect_right(self.offsets, stop - 1) - 1
+            elif end is not None:
+                i = bisect.bisect_right(self.starts, end) - 1
+            else:
+                i = len(self.blocks) - 1
+
+            rows = []
+            while i >= 0 and len(rows) < limit:
+                for row in reversed(self._read_block(i, stop)):
+                    ts = row[1]
+                    if end is not None and ts > end:
+                        continue
+                    if start is not None and ts < start:
+                        return rows, None
+                    rows.append(row)
+                    if len(rows) == limit:
+                        break
+                i -= 1
+            more = len(rows) == limit and (i >= 0 or rows[-1][0] > self.data_start)
+            return rows, (str(rows[-1][0]) if more else None)
+
+    def series(self, start=None, end=None, points=200):
+        """Downsampled chart data from the block counts: per bucket, the share
+        of DRY rows and the number of pump runs."""
+        self.refresh()
+        with self.lock:
+            lo = 0 if start is None else max(0, bisect.bisect_right(self.starts, start) - 1)
+            hi = len(self.blocks) if end is None else bisect.bisect_right(self.starts, end)
+            blocks = self.blocks[lo:hi]
+        if not blocks or points <= 0:
+            return []
+        if sum(b[2] for b in blocks) <= ROW_SERIES_LIMIT:
+            # Short range: bucket the rows themselves, blocks are too coarse
+            with self.lock:
+                rows = [r for i in range(lo, lo + len(blocks)) for r in self._read_block(i)]
+            rows = [r for r in rows if (start is None or r[1] >= start) and (end is None or r[1] <= end)]
+            blocks = [[r[0], r[1], 1, r[2] == "DRY", r[4] == "WATERED"] for r in rows]
+        per = max(1, -(-len(blocks) // points))
+        out = []
+        for j in range(0, len(blocks), per):
+            group = blocks[j:j + per]
+            rows = sum(b[2] for b in group)
+            out.append({
+                "time": group[0][1].isoformat(),
+                "dry_fraction": round(sum(b[3] for b in group) / rows, 3) if rows else None,
+                "pump_events": int(sum(b[4] for b in group)),
+                "rows": rows,
+            })
+        return out
+
+
+def row_dict(row):
+    _, ts, state, val, action = row
+    return {"timestamp": ts.isoformat(), "state": state, "raw_value": val, "action": action}
+
+
+# Response time vs log size: python watering_history.py bench [rows]
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    from datetime import timedelta
+
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000_000
+    path = os.path.join(tempfile.mkdtemp(), "watering_log.csv")
+    t0 = datetime(2025, 1, 1)
+    written = 0
+    with open(path, "w", newline="") as f:
+        f.write("timestamp,state,raw_value,action\n")
+        for size in (total // 100, total // 10, total):
+            buf = io.StringIO()
+            w = csv.writer(buf)
+            for n in range(written, size):
+                dry = (n // 500) % 2
+                w.writerow([(t0 + timedelta(seconds=n)).isoformat(), "DRY" if dry else "WET",
+                            dry, "WATERED" if n % 1000 == 999 else ""])
+            f.write(buf.getvalue())
+            f.flush()
+            written = size
+
+            index = LogIndex(path)
+            start = time.perf_counter()
+            index.refresh()
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows, cursor = index.page(limit=100)
+            rows2, _ = index.page(limit=100, cursor=cursor)
+            mid = t0 + timedelta(seconds=size // 2)
+            rows3, _ = index.page(start=mid - timedelta(hours=1), end=mid, limit=100)
+            chart = index.series(points=200)
+            query = time.perf_counter() - start
+            print(f"📄 {size:>10,} rows: index {build:6.2f}s (once, then incremental), "
+                  f"3 pages + 200-pt series {1000 * query:6.1f} ms")